@@ -0,0 +1,220 @@
+import logging
+import multiprocessing
+import os
+import re
+import signal
+import threading
+import tomllib
+
+from dotenv import dotenv_values
+
+from metrics import METRICS
+from structured_log import setup_logging
+
+# Daemon config sections that can be set for all accounts and overridden per account
+JOB_SECTIONS = ('scheduler', 'polling', 'auto_like', 'auto_retweet', 'summary')
+NAME_RE = re.compile(r'^[A-Za-z0-9_.-]+$')
+MAX_RESTARTS = 5
+
+
+class Account:
+    """One X account: its name, credentials, data directory and daemon job config"""
+
+    def __init__(self, name, credentials, data_dir, config):
+        self.name = name
+        self.credentials = credentials
+        self.data_dir = data_dir
+        self.config = config
+
+    def __repr__(self):
+        return f"Account({self.name!r})"
+
+
+def _credentials(entry, base_dir):
+    """Read credentials from the account's env_file and/or inline api_key = ... keys"""
+    credentials = {}
+    if entry.get('env_file'):
+        path = os.path.join(base_dir, entry['env_file'])
+        if not os.path.exists(path):
+            raise ValueError(f"Account {entry['name']}: env_file {path} not found")
+        credentials.update({k: v for k, v in dotenv_values(path).items() if v})
+    for name in ('api_key', 'api_key_secret', 'access_token', 'access_token_secret', 'bearer_token'):
+        if entry.get(name):
+            credentials[name.upper()] = entry[name]
+    return credentials
+
+
+def load_accounts(path):
+    """Return (settings, accounts) from an accounts TOML file (see accounts.example.toml)"""
+    with open(path, 'rb') as f:
+        config = tomllib.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    data_dir = os.path.join(base_dir, config.get('data_dir', 'accounts'))
+    shared = {section: config[section] for section in JOB_SECTIONS if section in config}
+
+    accounts = []
+    names = set()
+    for entry in config.get('accounts', []):
+        name = entry.get('name', '')
+        if not NAME_RE.match(name):
+            raise ValueError(f"Invalid account name {name!r}: use letters, digits, _ . and - only")
+        if name in names:
+            raise ValueError(f"Duplicate account name {name!r}")
+        names.add(name)
+        job_config = {}
+        for section in JOB_SECTIONS:
+            merged = {**shared.get(section, {}), **entry.get(section, {})}
+            if merged:
+                job_config[section] = merged
+        scheduler = job_config.get('scheduler', {})
+        if scheduler.get('csv'):
+            # Shared or per-account, the CSV is relative to the accounts file like every other path
+            scheduler['csv'] = os.path.join(base_dir, scheduler['csv'])
+        accounts.append(Account(name, _credentials(entry, base_dir), os.path.join(data_dir, name), job_config))
+    if not accounts:
+        raise ValueError(f"No [[accounts]] entries in {path}")
+
+    settings = {
+        'workers': config.get('workers'),
+        'llm_cache': os.path.join(base_dir, config.get('llm_cache', 'llm_cache.db')),
+        'log_dir': os.path.join(base_dir, config.get('log_dir', 'logs')),
+        'metrics': config.get('metrics', {}),
+    }
+    if settings['metrics'].get('textfile_dir'):
+        settings['metrics']['textfile_dir'] = os.path.join(base_dir, settings['metrics']['textfile_dir'])
+    return settings, accounts
+
+
+def shard(accounts, workers):
+    """Split accounts round-robin into one list per worker"""
+    return [accounts[i::workers] for i in range(workers)]
+
+
+class SharedLLM:
+    """Builds one LLMHandler per process on first use, for every account in it to share.
+
+    All processes point at the same LLM cache file, so a response generated
+    for one account is a cache hit for every other.
+    """
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self._handler = None
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            if self._handler is None:
+                from http_pool import HttpPoolConfig
+                from llm_cache import LLMCache
+                from llm_handler import LLMHandler
+                self._handler = LLMHandler(cache=LLMCache(self.cache_path), http_config=HttpPoolConfig.from_env())
+            return self._handler
+
+
+def run_worker(index, accounts, settings, parent_stop):
+    """Process entry point: run a daemon for each account until parent_stop is set"""
+    # The parent coordinates shutdown; Ctrl+C in the terminal must not kill workers mid-step
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+
+    os.makedirs(settings['log_dir'], exist_ok=True)
+    setup_logging(os.path.join(settings['log_dir'], f"worker-{index}.log"))
+    METRICS.set_labels(worker=str(index))
+    metrics = settings['metrics']
+    server = None
+    if metrics.get('port'):
+        server = METRICS.start_http_server(metrics['port'] + index, metrics.get('host', '127.0.0.1'))
+    if metrics.get('textfile_dir'):
+        os.makedirs(metrics['textfile_dir'], exist_ok=True)
+        METRICS.start_textfile_writer(os.path.join(metrics['textfile_dir'], f"bot-worker-{index}.prom"),
+                                      metrics.get('interval', 15), stop_event)
+
+    from bot import TwitterBot
+    from daemon import BotDaemon
+
+    llm = SharedLLM(settings['llm_cache'])
+    daemons = []
+    for account in accounts:
+        try:
+            bot = TwitterBot(account=account, llm=llm)
+            daemon = BotDaemon(bot, account.config, stop_event, name=account.name)
+            daemon.start()
+            daemons.append(daemon)
+        except Exception as e:
+            logging.error(f"Account {account.name} could not start: {e}")
+            print(f"Account {account.name} could not start: {e}")
+    logging.info(f"Worker {index} running {len(daemons)} of {len(accounts)} accounts")
+
+    while not stop_event.wait(1):
+        if parent_stop.is_set():
+            break
+    stop_event.set()
+    for daemon in daemons:
+        daemon.shutdown()
+    if server is not None:
+        server.shutdown()
+
+
+def run_accounts(path, workers=None):
+    """Run every account in path, sharded across worker processes, until SIGTERM or Ctrl+C
+
+    Accounts are spread round-robin over min(workers, accounts) processes
+    (default: one per CPU). Each account has its own client, rate budgets,
+    outbox, scheduler, search state and trusted sources under
+    data_dir/<name>; the LLM cache file is shared. A worker that dies is
+    restarted up to MAX_RESTARTS times.
+    """
+    settings, accounts = load_accounts(path)
+    os.makedirs(settings['log_dir'], exist_ok=True)
+    setup_logging(os.path.join(settings['log_dir'], 'main.log'))
+    workers = min(workers or settings['workers'] or os.cpu_count() or 1, len(accounts))
+    shards = shard(accounts, workers)
+    # spawn gives every worker a clean interpreter: no inherited locks, threads or SQLite handles
+    context = multiprocessing.get_context('spawn')
+    stop = context.Event()
+    # Signal handlers only set this; setting the multiprocessing Event from a handler can deadlock
+    # with the main thread's own wait on it
+    stopping = threading.Event()
+
+    def launch(index):
+        process = context.Process(target=run_worker, args=(index, shards[index], settings, stop),
+                                  name=f"bot-worker-{index}")
+        process.start()
+        return process
+
+    def handle_signal(signum, frame):
+        logging.info(f"Received signal {signum}, stopping {workers} workers")
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+    processes = [launch(i) for i in range(workers)]
+    restarts = [0] * workers
+    given_up = set()
+    print(f"Running {len(accounts)} accounts in {workers} worker processes. Send SIGTERM to stop.")
+    logging.info(f"Started {workers} workers for {len(accounts)} accounts")
+
+    while not stopping.wait(1) and len(given_up) < workers:
+        for index, process in enumerate(processes):
+            if process.is_alive() or index in given_up:
+                continue
+            names = ', '.join(account.name for account in shards[index])
+            if restarts[index] >= MAX_RESTARTS:
+                logging.error(f"Worker {index} ({names}) keeps exiting, giving up on it")
+                given_up.add(index)
+                continue
+            restarts[index] += 1
+            logging.error(f"Worker {index} ({names}) exited with {process.exitcode}, restarting")
+            if stopping.wait(min(2 ** restarts[index], 30)):
+                break
+            processes[index] = launch(index)
+
+    stop.set()
+    for process in processes:
+        process.join(30)
+        if process.is_alive():
+            logging.warning(f"{process.name} did not stop in time, terminating")
+            process.terminate()
+    logging.info("All workers stopped")
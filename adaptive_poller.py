@@ -0,0 +1,148 @@
+import math
+import threading
+import time
+
+from metrics import METRICS
+
+
+class QueryStats:
+    """Polling state for one search query"""
+
+    def __init__(self):
+        self.rate = None  # estimated new tweets per second (EWMA)
+        self.empty_polls = 0
+        self.last_poll = None
+        self.next_poll = 0.0
+
+
+class AdaptivePoller:
+    """Decides when each search query is polled and how many pages to fetch.
+
+    Every poll feeds the number of new tweets and their created_at times
+    into a per-query EWMA of the arrival rate. The next poll is scheduled
+    for when about target_tweets should have arrived, so busy queries are
+    polled often and quiet ones rarely; a poll that finds nothing doubles
+    the wait (min_interval, 2x, 4x, ... up to max_interval). Intervals are
+    never shorter than the query's fair share of the remaining search
+    budget allows, and the page count is sized to what arrived since the
+    last poll, so a backlog is fetched in one go instead of being missed.
+    """
+
+    def __init__(self, rate_limiter=None, min_interval=30, max_interval=3600, target_tweets=50,
+                 max_pages=3, page_size=100, alpha=0.3, endpoint='search'):
+        self.rate_limiter = rate_limiter
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_tweets = target_tweets
+        self.max_pages = max_pages
+        self.page_size = page_size
+        self.alpha = alpha
+        self.endpoint = endpoint
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def configure(self, **settings):
+        """Override settings (e.g. from a daemon config section); unknown names raise"""
+        for name, value in settings.items():
+            if not hasattr(self, name) or name.startswith('_'):
+                raise ValueError(f"Unknown polling setting {name!r}")
+            setattr(self, name, value)
+
+    def _get(self, key):
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = QueryStats()
+        return stats
+
+    def _budget(self):
+        """(calls left, seconds until the window resets), or None without a rate limiter"""
+        if self.rate_limiter is None:
+            return None
+        return self.rate_limiter.remaining(self.endpoint), self.rate_limiter.reset_in(self.endpoint)
+
+    def retain(self, keys, prefix=''):
+        """Forget keys starting with prefix that are not in keys (e.g. shards no longer planned)
+
+        Stale keys would otherwise count as active queries and shrink every
+        live query's share of the budget.
+        """
+        keys = set(keys)
+        with self._lock:
+            for key in [k for k in self._stats if k.startswith(prefix) and k not in keys]:
+                del self._stats[key]
+
+    def due(self, keys, now=None):
+        """Return the keys that should be polled now, most overdue first"""
+        now = now or time.time()
+        with self._lock:
+            due = [(self._get(key).next_poll, key) for key in keys if self._get(key).next_poll <= now]
+        return [key for _, key in sorted(due)]
+
+    def next_wait(self, keys, now=None):
+        """Seconds until the first of keys is due (0 if one is due now)"""
+        now = now or time.time()
+        with self._lock:
+            first = min((self._get(key).next_poll for key in keys), default=now + self.min_interval)
+        return max(0.0, first - now)
+
+    def pages(self, key, now=None):
+        """Pages to fetch for key: enough for the tweets expected since its last poll"""
+        now = now or time.time()
+        with self._lock:
+            stats = self._get(key)
+            if stats.rate is None or stats.last_poll is None:
+                pages = 1
+            else:
+                expected = stats.rate * (now - stats.last_poll)
+                pages = max(1, min(self.max_pages, math.ceil(expected / self.page_size)))
+            active = len(self._stats)
+        budget = self._budget()
+        if budget is not None:
+            pages = max(1, min(pages, budget[0] // max(active, 1)))
+        return pages
+
+    def observe(self, key, tweets, pages, more=False, now=None):
+        """Record a poll of key that fetched tweets over pages calls and schedule the next one
+
+        more means the API had further pages, so the tweets only cover the
+        time since the oldest of them rather than since the last poll.
+        """
+        now = now or time.time()
+        times = [t.created_at.timestamp() for t in tweets if getattr(t, 'created_at', None)]
+        with self._lock:
+            stats = self._get(key)
+            if stats.last_poll is not None and not more:
+                window = now - stats.last_poll
+            elif times:
+                window = now - min(times)
+            else:
+                window = None
+            if window is not None or not tweets:
+                sample = len(tweets) / max(window or 0, 1.0)
+                stats.rate = sample if stats.rate is None else self.alpha * sample + (1 - self.alpha) * stats.rate
+            stats.empty_polls = 0 if tweets else stats.empty_polls + 1
+            stats.last_poll = now
+
+            if stats.empty_polls:
+                interval = self.min_interval * 2 ** (stats.empty_polls - 1)
+            elif stats.rate:
+                interval = self.target_tweets / stats.rate
+            else:
+                interval = self.max_interval
+            interval = min(max(interval, self.min_interval), self.max_interval)
+            active = len(self._stats)
+        budget = self._budget()
+        if budget is not None:
+            remaining, reset_in = budget
+            # This query's share of what is left, spread over the rest of the window
+            if remaining <= 0:
+                interval = max(interval, reset_in)
+            else:
+                interval = max(interval, pages * active * reset_in / remaining)
+        with self._lock:
+            stats.next_poll = now + interval
+
+        METRICS.inc('search_polls_total', help="Adaptive search polls by result",
+                    result='new' if tweets else 'empty')
+        METRICS.inc('search_poll_tweets_total', len(tweets), help="New tweets fetched by adaptive search polls")
+        return interval
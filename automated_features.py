@@ -1,72 +1,242 @@
+import os
 import time
 import logging
+from datetime import datetime, timedelta, timezone
+from collections import defaultdict, deque
 from typing import List, Optional
-import schedule
+import tweepy
+from rate_limiter import RateLimiter
+from search_state import SearchState, IncrementalSearcher
+from query_planner import ShardedSearch
+from adaptive_poller import AdaptivePoller
+from trusted_sources import TrustedSourceStore
+from summarizer import MapReduceSummarizer
+from keyword_scorer import KeywordScorer, CandidateQueue, parse_keywords
+from structured_log import log_event
 
 class AutomatedFeatures:
-    def __init__(self, client, llm_handler):
+    def __init__(self, client, llm_handler, post_tweet=None, rate_limiter=None, data_dir='.'):
         self.client = client
-        self.llm = llm_handler
-        self.last_search_time = 0
-        self.search_cooldown = 900  # 15 minutes
-        self.daily_tweet_count = 0
-        self.tweet_limit = 17
-        self.last_tweet_reset = time.time()
-        self.trusted_sources = self.load_trusted_sources()
-
-    def load_trusted_sources(self):
-            """Load trusted sources from a file"""
-            try:
-                with open('trusted_sources.txt', 'r') as f:
-                    return [line.strip() for line in f if line.strip()]
-            except FileNotFoundError:
-                with open('trusted_sources.txt', 'w') as f:
-                    f.write('')
-                return []
-
-    def save_trusted_sources(self):
-        """Save trusted sources to a file"""
-        with open('trusted_sources.txt', 'w') as f:
-            for source in self.trusted_sources:
-                f.write(f'{source}\n')
+        # Either an LLMHandler or a zero-argument callable that builds one on first use
+        self._llm = llm_handler
+        self.post_tweet = post_tweet
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.action_interval = 900  # at most one like / retweet every 15 minutes
+        self.last_action_time = {'like': 0, 'retweet': 0}
+        self.search_state = SearchState(os.path.join(data_dir, 'search_state.db'))
+        self.searcher = IncrementalSearcher(client, self.search_state, self.rate_limiter)
+        # Schedules each search shard from its own tweet arrival rate and the search budget
+        self.poller = AdaptivePoller(self.rate_limiter)
+        self.source_search = ShardedSearch(self.searcher, self.rate_limiter, poller=self.poller)
+        # Fetched tweets not yet acted on, per cursor key, so a search result is never wasted
+        self.candidates = defaultdict(lambda: deque(maxlen=500))
+        # Scored like candidates per keyword set, best first
+        self.like_candidates = defaultdict(lambda: CandidateQueue(200))
+        self._like_scorer = None
+        self.trusted_sources = TrustedSourceStore(
+            os.path.join(data_dir, 'trusted_sources.txt'),
+            ids_path=os.path.join(data_dir, 'trusted_source_ids.json')
+        )
+
+    @property
+    def llm(self):
+        if callable(self._llm):
+            self._llm = self._llm()
+        return self._llm
 
     def manage_trusted_sources(self):
         """Manage trusted sources list"""
         while True:
             print("\n=== Trusted Sources Management ===")
-            print("Current trusted sources:")
-            for i, source in enumerate(self.trusted_sources, 1):
+            print(f"{len(self.trusted_sources)} trusted sources:")
+            sources = list(self.trusted_sources)
+            for i, source in enumerate(sources[:20], 1):
                 print(f"{i}. {source}")
-            print("\n1. Add trusted source")
-            print("2. Remove trusted source")
-            print("3. Return to main menu")
-            
-            choice = input("\nEnter your choice (1-3): ")
-            
+            if len(sources) > 20:
+                print(f"... and {len(sources) - 20} more (export to see them all)")
+            print("\n1. Add trusted sources")
+            print("2. Remove trusted sources")
+            print("3. Import from file")
+            print("4. Export to file")
+            print("5. Return to main menu")
+
+            choice = input("\nEnter your choice (1-5): ")
+
             if choice == '1':
-                new_source = input("Enter username to add (without @): ").strip()
-                if new_source and new_source not in self.trusted_sources:
-                    self.trusted_sources.append(new_source)
-                    self.save_trusted_sources()
-                    print(f"Added {new_source} to trusted sources")
+                names = input("Enter usernames to add (without @, separated by spaces or commas): ")
+                rejected = []
+                added = self.trusted_sources.add_many(names.replace(',', ' ').split(), rejected)
+                print(f"Added {len(added)} trusted sources" + (f": {', '.join(added)}" if len(added) <= 10 else ""))
+                self._report_rejected(rejected)
             elif choice == '2':
-                if self.trusted_sources:
-                    index = int(input("Enter number to remove: ")) - 1
-                    if 0 <= index < len(self.trusted_sources):
-                        removed = self.trusted_sources.pop(index)
-                        self.save_trusted_sources()
-                        print(f"Removed {removed} from trusted sources")
-                else:
+                if not self.trusted_sources:
                     print("No trusted sources to remove")
+                    continue
+                entries = input("Enter numbers or usernames to remove: ").replace(',', ' ').split()
+                names = [sources[int(e) - 1] if e.isdigit() and 0 < int(e) <= len(sources) else e for e in entries]
+                removed = self.trusted_sources.remove_many(names)
+                print(f"Removed {len(removed)} trusted sources" + (f": {', '.join(removed)}" if len(removed) <= 10 else ""))
             elif choice == '3':
+                filename = input("Enter file to import (one username per line): ").strip()
+                rejected = []
+                try:
+                    print(f"Imported {self.trusted_sources.import_file(filename, rejected)} new trusted sources")
+                    self._report_rejected(rejected)
+                except OSError as e:
+                    print(f"Could not read {filename}: {e}")
+            elif choice == '4':
+                filename = input("Enter file to export to: ").strip()
+                try:
+                    print(f"Exported {self.trusted_sources.export(filename)} trusted sources to {filename}")
+                except OSError as e:
+                    print(f"Could not write {filename}: {e}")
+            elif choice == '5':
+                self.trusted_sources.compact()
+                break
+
+    @staticmethod
+    def _report_rejected(rejected):
+        if rejected:
+            shown = ', '.join(rejected[:10]) + (', ...' if len(rejected) > 10 else '')
+            print(f"Skipped {len(rejected)} invalid usernames (letters, digits and _ only, up to 15): {shown}")
+
+    def _next_action_wait(self, action):
+        """Seconds until we may perform action again"""
+        return max(
+            self.last_action_time[action] + self.action_interval - time.time(),
+            self.rate_limiter.next_available(action)
+        )
+
+    def _next_wait(self, action, candidates, sources, operator='from:'):
+        """Seconds until the next search shard is due or, with candidates queued, the next action"""
+        wait = self.source_search.next_poll(sources, action, operator)
+        if candidates:
+            wait = min(wait, self._next_action_wait(action))
+        return max(wait, 1.0)
+
+    def _rate_limited_wait(self):
+        """Seconds to back off after a 429, taken from the limiter's view of the search window"""
+        return self.rate_limiter.next_available('search') or self.poller.min_interval
+
+    def _sleep(self, seconds, stop_event=None):
+        """Sleep for seconds, returning True early if stop_event is set"""
+        if stop_event is None:
+            time.sleep(seconds)
+            return False
+        return stop_event.wait(seconds)
+
+    def _scorer(self, keywords):
+        """Return the KeywordScorer for keywords, rebuilding it only when they change"""
+        key = tuple(keywords)
+        if self._like_scorer is None or self._like_scorer[0] != key:
+            words, exclusions = parse_keywords(keywords)
+            trusted_ids = [self.trusted_sources.user_id(name) for name in self.trusted_sources]
+            scorer = KeywordScorer(words, exclusions, trusted_ids=[i for i in trusted_ids if i])
+            self._like_scorer = (key, scorer)
+        return self._like_scorer[1]
+
+    def _fetch_like_candidates(self, keywords):
+        """Search the shards that are due and queue the new matches by score; returns the queue
+
+        New matching tweets are scored locally and added to a bounded
+        best-first queue, so each like goes to the most relevant tweet seen
+        so far rather than simply the newest.
+        """
+        scorer = self._scorer(keywords)
+        candidates = self.like_candidates[tuple(keywords)]
+        tweets = self.source_search.search(
+            scorer.search_terms(),
+            'like',
+            operator='',
+            tweet_fields=['text', 'author_id', 'created_at'],
+            expansions=['author_id'],
+            user_fields=['public_metrics', 'verified']
+        )
+        for score, tweet in scorer.score_batch(tweets, self.searcher.users):
+            candidates.push(score, tweet)
+        if tweets:
+            logging.info("Scored %d tweets, %d like candidates queued", len(tweets), len(candidates))
+        return candidates
+
+    def _like_best(self, candidates):
+        """Like the best queued candidate; returns True if one was liked, None on an auth error"""
+        while candidates:
+            candidate = candidates.pop()
+            if candidate is None:
+                break
+            score, tweet = candidate
+            if not self.rate_limiter.acquire('like'):
+                candidates.push(score, tweet)
+                wait = self.rate_limiter.next_available('like')
+                print(f"Like budget used up, next like possible in {wait / 60:.0f} minutes")
+                return False
+            try:
+                self.client.like(tweet.id)
+                self.search_state.mark_seen('like', tweet.id)
+                print(f"Liked tweet (score {score:.1f}): {tweet.text[:50]}...")
+                log_event('like', 'ok', tweet.id, 'like', None, "Liked with score %.2f", score)
+                self.last_action_time['like'] = time.time()
+                return True
+            except tweepy.errors.Forbidden as e:
+                self.search_state.mark_seen('like', tweet.id)
+                log_event('like', 'forbidden', tweet.id, 'like', None, "%s", e, level=logging.WARNING)
+                print(f"Cannot like tweet (permission error): {e}")
+            except tweepy.errors.Unauthorized:
+                print("Authentication error while liking tweet")
+                return None
+            except tweepy.errors.TooManyRequests:
+                candidates.push(score, tweet)
+                log_event('like', 'rate_limited', tweet.id, 'like', level=logging.WARNING)
+                print("Like rate limit reached")
+                return False
+            except Exception as e:
+                log_event('like', 'error', tweet.id, 'like', None, "%s", e, level=logging.ERROR)
+                print(f"Error liking tweet: {e}")
+        return False
+
+    def _like_cycle(self, keywords):
+        """Run one auto-like cycle; returns True if a tweet was liked, None on an auth error"""
+        candidates = self._fetch_like_candidates(keywords)
+        if not candidates:
+            print("No new tweets found matching the keywords")
+            return False
+        return self._like_best(candidates)
+
+    def run_auto_like(self, keywords, stop_event=None):
+        """Like tweets matching keywords until stop_event is set (or forever)
+
+        Searches run whenever the poller says a shard is due, also while
+        waiting out the action interval, so the candidate queue stays fresh;
+        a like is made whenever the interval and like budget allow.
+        """
+        terms = self._scorer(keywords).search_terms()
+        candidates = self.like_candidates[tuple(keywords)]
+        while not (stop_event and stop_event.is_set()):
+            try:
+                self._fetch_like_candidates(keywords)
+                if candidates and self._next_action_wait('like') <= 0:
+                    if self._like_best(candidates) is None:
+                        return
+            except tweepy.errors.Unauthorized:
+                print("Authentication error. Please check your Bearer Token.")
+                return
+            except tweepy.errors.TooManyRequests:
+                wait_time = self._rate_limited_wait()
+                print(f"Rate limit reached. Waiting {wait_time:.0f} seconds...")
+                self._sleep(wait_time, stop_event)
+                continue
+            except Exception as e:
+                print(f"Error searching tweets: {e}")
+
+            if self._sleep(self._next_wait('like', candidates, terms, operator=''), stop_event):
                 break
 
     def auto_like_tweets(self):
         """Set up automatic liking of tweets with specific keywords"""
-        keywords = input("Enter keywords to monitor (comma-separated): ").split(',')
+        keywords = input("Enter keywords to monitor (comma-separated, -word to exclude): ").split(',')
         keywords = [k.strip() for k in keywords if k.strip()]
         
-        if not keywords:
+        if not parse_keywords(keywords)[0]:
             print("No valid keywords provided")
             return
             
@@ -74,56 +244,83 @@ class AutomatedFeatures:
             print(f"\nMonitoring for keywords: {', '.join(keywords)}")
             print("Will attempt to like one tweet every 15 minutes")
             print("Press Ctrl+C to stop monitoring")
-            
-            while True:
-                try:
-                    if time.time() - self.last_search_time >= self.search_cooldown:
-                        query = ' OR '.join(keywords)
-                        try:
-                            tweets = self.client.search_recent_tweets(
-                                query=query,
-                                max_results=10,
-                                tweet_fields=['text', 'author_id']
-                            )
-                            
-                            if tweets and hasattr(tweets, 'data') and tweets.data:
-                                for tweet in tweets.data:
-                                    try:
-                                        self.client.like(tweet.id)
-                                        print(f"Liked tweet: {tweet.text[:50]}...")
-                                        self.last_search_time = time.time()
-                                        break
-                                    except tweepy.errors.Forbidden as e:
-                                        print(f"Cannot like tweet (permission error): {e}")
-                                    except tweepy.errors.Unauthorized as e:
-                                        print("Authentication error while liking tweet")
-                                        return
-                                    except Exception as e:
-                                        print(f"Error liking tweet: {e}")
-                            else:
-                                print("No tweets found matching the keywords")
-                                time.sleep(60)
-                                
-                        except tweepy.errors.Unauthorized:
-                            print("Authentication error. Please check your Bearer Token.")
-                            return
-                        except tweepy.errors.TooManyRequests:
-                            wait_time = 900  # 15 minutes
-                            print(f"Rate limit reached. Waiting {wait_time} seconds...")
-                            time.sleep(wait_time)
-                        except Exception as e:
-                            print(f"Error searching tweets: {e}")
-                            time.sleep(60)
-                    
-                    time.sleep(60)  # Check every minute
-                    
-                except KeyboardInterrupt:
-                    print("\nStopped auto-liking tweets")
-                    break
-                
+            self.run_auto_like(keywords)
+        except KeyboardInterrupt:
+            print("\nStopped auto-liking tweets")
         except Exception as e:
             print(f"Fatal error: {e}")
-            logging.error(f"Fatal error in auto_like_tweets: {e}")
+            logging.error("Fatal error in auto_like_tweets: %s", e)
+
+    def _fetch_retweet_candidates(self):
+        """Search the trusted source shards that are due and queue their new tweets"""
+        candidates = self.candidates['retweet:trusted']
+        self.trusted_sources.resolve_ids(self.client, self.rate_limiter)
+        candidates.extend(self.source_search.search(
+            self.trusted_sources.query_terms(), 'retweet', tweet_fields=['text', 'author_id', 'created_at']
+        ))
+        return candidates
+
+    def _retweet_next(self, candidates):
+        """Retweet the oldest queued candidate; returns True if one was retweeted"""
+        while candidates:
+            if not self.rate_limiter.acquire('retweet'):
+                wait = self.rate_limiter.next_available('retweet')
+                print(f"Retweet budget used up, next retweet possible in {wait / 60:.0f} minutes")
+                return False
+            tweet = candidates.popleft()
+            try:
+                self.client.retweet(tweet.id)
+                self.search_state.mark_seen('retweet', tweet.id)
+                author = self.trusted_sources.username_for(tweet.author_id) or tweet.author_id
+                print(f"Retweeted from {author}: {tweet.text[:50]}...")
+                log_event('retweet', 'ok', tweet.id, 'retweet', None, "Retweeted from %s", author)
+                self.last_action_time['retweet'] = time.time()
+                return True
+            except tweepy.errors.TooManyRequests:
+                candidates.appendleft(tweet)
+                log_event('retweet', 'rate_limited', tweet.id, 'retweet', level=logging.WARNING)
+                print("Retweet rate limit reached")
+                return False
+            except tweepy.errors.Forbidden as e:
+                self.search_state.mark_seen('retweet', tweet.id)
+                log_event('retweet', 'forbidden', tweet.id, 'retweet', None, "%s", e, level=logging.WARNING)
+                print(f"Error retweeting: {e}")
+            except Exception as e:
+                log_event('retweet', 'error', tweet.id, 'retweet', None, "%s", e, level=logging.ERROR)
+                print(f"Error retweeting: {e}")
+        return False
+
+    def _retweet_cycle(self):
+        """Run one auto-retweet cycle; returns True if a tweet was retweeted"""
+        return self._retweet_next(self._fetch_retweet_candidates())
+
+    def run_auto_retweet(self, stop_event=None):
+        """Retweet trusted sources until stop_event is set (or forever)
+
+        Polls each source shard on its own adaptive schedule and retweets
+        whenever the action interval and retweet budget allow.
+        """
+        candidates = self.candidates['retweet:trusted']
+        while not (stop_event and stop_event.is_set()):
+            try:
+                self._fetch_retweet_candidates()
+                if candidates and self._next_action_wait('retweet') <= 0:
+                    self._retweet_next(candidates)
+            except tweepy.errors.TooManyRequests:
+                wait_time = self._rate_limited_wait()
+                print(f"Rate limit reached. Waiting {wait_time:.0f} seconds...")
+                self._sleep(wait_time, stop_event)
+                continue
+            except tweepy.errors.Unauthorized:
+                print("Authentication error. Please check your Bearer Token.")
+                return
+            except Exception as e:
+                print(f"Error searching trusted sources: {e}")
+                logging.error("Error in auto-retweet cycle: %s", e)
+
+            wait = self._next_wait('retweet', candidates, self.trusted_sources.query_terms())
+            if self._sleep(wait, stop_event):
+                break
             
     def auto_retweet_trusted(self):
         """Auto-retweet from trusted sources"""
@@ -132,34 +329,46 @@ class AutomatedFeatures:
             return
             
         try:
-            print(f"\nMonitoring trusted sources: {', '.join(self.trusted_sources)}")
+            if len(self.trusted_sources) > 10:
+                print(f"\nMonitoring {len(self.trusted_sources)} trusted sources")
+            else:
+                print(f"\nMonitoring trusted sources: {', '.join(self.trusted_sources)}")
             print("Will attempt to retweet one post every 15 minutes")
             print("Press Ctrl+C to stop monitoring")
-            
-            while True:
-                if time.time() - self.last_search_time >= self.search_cooldown:
-                    query = f"from:{' OR from:'.join(self.trusted_sources)}"
-                    tweets = self.client.search_recent_tweets(
-                        query=query,
-                        max_results=10
-                    )
-                    
-                    if tweets.data:
-                        for tweet in tweets.data:
-                            try:
-                                self.client.retweet(tweet.id)
-                                print(f"Retweeted from {tweet.author_id}: {tweet.text[:50]}...")
-                                self.last_search_time = time.time()
-                                break
-                            except Exception as e:
-                                print(f"Error retweeting: {e}")
-                                continue
-                
-                time.sleep(60)
-                
+            self.run_auto_retweet()
         except KeyboardInterrupt:
             print("\nStopped auto-retweeting")
 
+    def summarize(self, keywords, hours=24, max_pages=20):
+        """Summarize up to max_pages x 100 tweets for keywords from the last hours; returns None if there are none
+
+        Re-running over an overlapping window only pays for the parts of the
+        map-reduce that changed; the rest comes from the LLM cache.
+        """
+        query = ' OR '.join(keywords)
+        pages = min(max_pages, self.rate_limiter.remaining('search'))
+        if pages <= 0:
+            wait = self.rate_limiter.next_available('search')
+            print(f"Search budget used up, try again in {wait / 60:.0f} minutes")
+            return None
+        # Recent search only reaches back seven days
+        start_time = datetime.now(timezone.utc) - timedelta(hours=min(hours, 7 * 24 - 1))
+        tweets = self.searcher.search(query, max_pages=pages, start_time=start_time)
+
+        if not tweets:
+            print(f"No tweets found for the given keywords in the last {hours} hours")
+            return None
+
+        print(f"Summarizing {len(tweets)} tweets...")
+        return MapReduceSummarizer(self.llm).summarize([(t.id, t.text) for t in tweets], ', '.join(keywords))
+
+    def _post(self, text):
+        if self.post_tweet:
+            return self.post_tweet(text)
+        self.client.create_tweet(text=text)
+        print("Summary tweeted successfully!")
+        return True
+
     def create_content_summary(self):
         """Create a summary of recent tweets from monitoring keywords"""
         keywords = input("Enter keywords for content summary (comma-separated): ").split(',')
@@ -170,26 +379,13 @@ class AutomatedFeatures:
             return
             
         try:
-            query = ' OR '.join(keywords)
-            tweets = self.client.search_recent_tweets(
-                query=query,
-                max_results=10
-            )
-            
-            if not tweets.data:
-                print("No tweets found for the given keywords")
+            summary = self.summarize(keywords)
+            if summary is None:
                 return
-                
-            # Prepare tweets for summarization
-            tweet_texts = [tweet.text for tweet in tweets.data]
-            summary_prompt = f"SECRET_WORD Create a brief summary of these tweets about {', '.join(keywords)}:\n" + "\n".join(tweet_texts)
-            
-            summary = self.llm.get_response(summary_prompt)
             print(f"\nGenerated Summary:\n{summary}")
             
             if input("\nWould you like to tweet this summary? (y/n): ").lower() == 'y':
-                self.client.create_tweet(text=summary)
-                print("Summary tweeted successfully!")
+                self._post(summary)
                 
         except Exception as e:
             print(f"Error creating summary: {e}")
@@ -0,0 +1,268 @@
+"""End-to-end benchmarks for the bot's automation paths against mock_api.py.
+
+Runs a real TwitterBot in a temporary directory with every X and OpenAI
+request answered by a local MockApiServer, then reports throughput and
+p50/p99 latency per path. No credentials or network access are needed.
+
+    python benchmark.py --latency 0.02 --iterations 200
+    python benchmark.py --json results.json
+    python benchmark.py --baseline results.json   # exit 1 on regressions
+
+It also times the one-shot path (`python bot.py --tweet TEXT`) end to end
+in a fresh interpreter and fails if its median exceeds --startup-target.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from mock_api import MockApiServer
+
+SECRET_WORD = 'benchsecret'
+STARTUP_TARGET = 0.75  # seconds for python bot.py --tweet, excluding API latency
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[int(round(q * (len(ordered) - 1)))]
+
+
+def llm_ok(text):
+    """LLMHandler methods report failures as a reply instead of raising"""
+    return not text.startswith("Sorry, I encountered an error")
+
+
+def measure(name, func, iterations, ok=None):
+    """Call func(i) iterations times and summarise throughput and latency
+
+    A call fails if it raises or if ok(result) is false; the paths timed
+    here mostly report failure through their return value. Only successful
+    calls count towards ops/sec and the latency percentiles, so fast
+    failures cannot make a run look better.
+    """
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for i in range(iterations):
+        t = time.perf_counter()
+        try:
+            result = func(i)
+        except Exception:
+            errors += 1
+            continue
+        if ok is not None and not ok(result):
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - t)
+    total = time.perf_counter() - start
+    return summarize(name, iterations - errors, total, latencies, errors)
+
+
+def summarize(name, ops, total, latencies=None, errors=0):
+    return {
+        'name': name,
+        'ops': ops,
+        'errors': errors,
+        'seconds': round(total, 4),
+        'ops_per_sec': round(ops / total, 2) if total else None,
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+    }
+
+
+def mock_env(mock):
+    return {
+        'API_KEY': 'mock', 'API_KEY_SECRET': 'mock',
+        # tweepy takes the authenticating user id from the access token prefix
+        'ACCESS_TOKEN': '1-mock', 'ACCESS_TOKEN_SECRET': 'mock', 'BEARER_TOKEN': 'mock',
+        'X_API_BASE_URL': mock.url,
+        'OPENAI_API_KEY': 'mock', 'OPENAI_BASE_URL': f"{mock.url}/v1",
+        'LLM_SECRET_WORD': SECRET_WORD,
+    }
+
+
+def make_bot(mock):
+    """Build a TwitterBot wired to the mock server"""
+    os.environ.update(mock_env(mock))
+    from bot import TwitterBot
+    bot = TwitterBot()
+    bot.rate_limiter.daily_post_cap = 10 ** 9
+    return bot
+
+
+def unique_post():
+    """Post text that is never a near-duplicate of another, so the history check lets it through"""
+    return f"Benchmark {uuid.uuid4().hex} {uuid.uuid4().hex}"
+
+
+def run_benchmarks(bot, iterations):
+    results = []
+    run_id = uuid.uuid4().hex[:8]
+    automated = bot.automated
+
+    results.append(measure(
+        'post (send_manual_tweet)',
+        lambda i: bot.send_manual_tweet(unique_post()),
+        iterations,
+        ok=lambda sent: sent is True
+    ))
+
+    tweets = [unique_post() for _ in range(iterations)]
+    bot.scheduler.stop()
+    start = time.perf_counter()
+    bot.schedule_tweets(tweets, interval_hours=0)
+    while bot.scheduler.pending() or bot.outbox.unsent():
+        time.sleep(0.001)
+    results.append(summarize('post (scheduler drain)', iterations, time.perf_counter() - start))
+
+    results.append(measure(
+        'search (1 page of 100)',
+        lambda i: automated.searcher.search(f"bench {run_id}", cursor_key=f"bench:{run_id}", max_pages=1),
+        iterations
+    ))
+
+    results.append(measure(
+        'like (auto-like cycle)',
+        lambda i: automated._like_cycle([f"bench{run_id}"]),
+        iterations,
+        ok=lambda liked: liked is True
+    ))
+
+    results.append(measure(
+        'llm call (uncached)',
+        lambda i: bot.llm.get_response(f"{SECRET_WORD} benchmark prompt {run_id} {i}", use_cache=False),
+        iterations,
+        ok=llm_ok
+    ))
+
+    results.append(measure(
+        'llm call (streamed)',
+        lambda i: bot.llm.get_response(f"{SECRET_WORD} stream prompt {run_id} {i}", use_cache=False,
+                                       on_token=lambda text: None),
+        iterations,
+        ok=llm_ok
+    ))
+
+    bot.llm.get_response(f"{SECRET_WORD} cached prompt {run_id}")
+    results.append(measure(
+        'llm call (cached)',
+        lambda i: bot.llm.get_response(f"{SECRET_WORD} cached prompt {run_id}"),
+        iterations,
+        ok=llm_ok
+    ))
+
+    prompts = [f"{SECRET_WORD} batch prompt {run_id} {i}" for i in range(iterations)]
+    start = time.perf_counter()
+    done = sum(1 for result in bot.llm.generate_tweets_batch(prompts, concurrency=8) if result.tweet)
+    results.append(summarize('llm batch (concurrency 8)', done, time.perf_counter() - start))
+    return results
+
+
+def measure_startup(mock, repo_dir, iterations):
+    """Time `python bot.py --tweet` in fresh processes (the first run warms the identity cache)
+
+    Runs in its own directory so the posts made by the other benchmarks do
+    not count against the daily post cap.
+    """
+    workdir = os.path.join(os.getcwd(), 'startup')
+    os.makedirs(workdir, exist_ok=True)
+    env = dict(os.environ, **mock_env(mock))
+    command = [sys.executable, os.path.join(repo_dir, 'bot.py'), '--tweet']
+    latencies = []
+    errors = 0
+    for i in range(iterations + 1):
+        t = time.perf_counter()
+        result = subprocess.run(command + [unique_post()], env=env, cwd=workdir,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if i:
+            latencies.append(time.perf_counter() - t)
+            errors += result.returncode != 0
+    return summarize('startup (bot.py --tweet)', iterations, sum(latencies), latencies, errors)
+
+
+def print_table(results):
+    print(f"{'benchmark':<30} {'ops':>6} {'errors':>6} {'ops/sec':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for r in results:
+        p50 = '-' if r['p50_ms'] is None else f"{r['p50_ms']:.2f}"
+        p99 = '-' if r['p99_ms'] is None else f"{r['p99_ms']:.2f}"
+        print(f"{r['name']:<30} {r['ops']:>6} {r['errors']:>6} {r['ops_per_sec']:>10.2f} {p50:>9} {p99:>9}")
+
+
+def compare(results, baseline, tolerance):
+    """Return descriptions of benchmarks whose throughput dropped by more than tolerance or that failed more"""
+    previous = {r['name']: r for r in baseline}
+    regressions = []
+    for r in results:
+        before = previous.get(r['name'])
+        if before and before['ops_per_sec'] and r['ops_per_sec'] < before['ops_per_sec'] * (1 - tolerance):
+            regressions.append(f"{r['name']}: {before['ops_per_sec']:.2f} -> {r['ops_per_sec']:.2f} ops/sec")
+        if before and r['errors'] > before['errors']:
+            regressions.append(f"{r['name']}: {before['errors']} -> {r['errors']} errors")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bot against a local mock API")
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.01, help="mock response latency in seconds")
+    parser.add_argument('--latency-jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--json', metavar='FILE', help="write results to FILE")
+    parser.add_argument('--baseline', metavar='FILE', help="compare against results saved with --json")
+    parser.add_argument('--startup-iterations', type=int, default=5)
+    parser.add_argument('--startup-target', type=float, default=STARTUP_TARGET,
+                        help="max median seconds for the one-shot post path, on top of --latency")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed throughput drop vs baseline")
+    args = parser.parse_args()
+
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, repo_dir)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    with MockApiServer(latency=args.latency, latency_jitter=args.latency_jitter, seed=0) as mock, \
+            tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        with contextlib.redirect_stdout(io.StringIO()):
+            bot = make_bot(mock)
+            # Inject errors only once the bot is up, so startup itself cannot fail
+            mock.error_rate = args.error_rate
+            results = run_benchmarks(bot, args.iterations)
+            bot.close()
+            mock.error_rate = 0.0
+        if args.startup_iterations:
+            results.append(measure_startup(mock, repo_dir, args.startup_iterations))
+        os.chdir(repo_dir)
+
+    print_table(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'latency': args.latency, 'iterations': args.iterations, 'results': results}, f, indent=2)
+    failed = False
+    startup = next((r for r in results if r['name'].startswith('startup')), None)
+    # One create_tweet round trip is unavoidable; everything else counts against the target
+    if startup and startup['p50_ms'] / 1000 > args.startup_target + args.latency:
+        print(f"STARTUP {startup['p50_ms']:.0f} ms exceeds target of "
+              f"{(args.startup_target + args.latency) * 1000:.0f} ms")
+        failed = True
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        failed = failed or bool(regressions)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
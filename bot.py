@@ -1,62 +1,157 @@
-import tweepy
 import os
 from dotenv import load_dotenv
-import schedule
-import time
+import hashlib
+import json
 import logging
-import csv
-from llm_handler import LLMHandler
-from automated_features import AutomatedFeatures
-from menu_handler import MenuHandler
+import itertools
+import argparse
+import sys
+import time
+from array import array
+from datetime import datetime
+from scheduler import PostScheduler, PostingWindow
+from csv_loader import TweetCsvReader, TweetRow
+from outbox import Outbox, make_key
+from rate_limiter import RateLimiter
+from metrics import METRICS, InstrumentedClient
+from http_pool import HttpPoolConfig, configure_session
+from post_history import PostHistory
+from structured_log import setup_logging, log_event
+
+# tweepy, openai and the automation modules are imported on first use so that
+# one-shot runs (python bot.py --tweet ...) start quickly.
+
+IDENTITY_CACHE = 'identity_cache.json'
+IDENTITY_TTL = 24 * 3600
+CREDENTIAL_NAMES = ('API_KEY', 'API_KEY_SECRET', 'ACCESS_TOKEN', 'ACCESS_TOKEN_SECRET', 'BEARER_TOKEN')
 
 class TwitterBot:
-    def __init__(self):
+    SCHEDULE_BATCH = 1000
+
+    def __init__(self, traffic=None, account=None, llm=None):
+        # Optional traffic.TrafficRecorder / TrafficReplayer for all X and OpenAI requests
+        self.traffic = traffic
+        # An accounts.Account supplies credentials and a data directory instead of .env and the cwd
+        self.account = account
+        self.data_dir = account.data_dir if account else '.'
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.identity_cache = self._path(IDENTITY_CACHE)
         self._configure_logging()
         self._load_environment()
-        self._initialize_client()
-        self._initialize_llm()
-        # Remove the circular dependency by initializing AutomatedFeatures after import
-        from automated_features import AutomatedFeatures
-        self.automated = AutomatedFeatures(self.client, self.llm)
-        self.menu_handler = MenuHandler(self)
+        self._client = None
+        # An LLMHandler, or a zero-argument callable returning one, to share between bots
+        self._llm = llm
+        self._automated = None
+        self._menu_handler = None
+        self.rate_limiter = RateLimiter()
+        self.outbox = Outbox(self._path('outbox.db'))
+        self.rate_limiter.seed_posts_today(self.outbox.sent_since(self._today_start()))
+        self.history = PostHistory(self._path('post_history.db'), threshold=self.duplicate_threshold)
+        if not self.history.count():
+            self.history.add_many(self.outbox.sent_posts())
+        self.scheduler = PostScheduler(self.deliver_post,
+                                       retry_after=lambda: self.rate_limiter.next_available('create_tweet'))
+
+    def _path(self, filename):
+        return os.path.join(self.data_dir, filename)
+
+    @property
+    def client(self):
+        """The tweepy client, created and verified on first use"""
+        if self._client is None:
+            self._initialize_client()
+        return self._client
+
+    @property
+    def llm(self):
+        """The LLM handler, created on first use so OpenAI is only loaded when needed"""
+        if self._llm is None:
+            self._initialize_llm()
+        elif callable(self._llm):
+            self._llm = self._llm()
+        return self._llm
+
+    @property
+    def automated(self):
+        if self._automated is None:
+            from automated_features import AutomatedFeatures
+            self._automated = AutomatedFeatures(
+                self.client, lambda: self.llm,
+                post_tweet=self.send_manual_tweet,
+                rate_limiter=self.rate_limiter,
+                data_dir=self.data_dir
+            )
+        return self._automated
+
+    @property
+    def menu_handler(self):
+        if self._menu_handler is None:
+            from menu_handler import MenuHandler
+            self._menu_handler = MenuHandler(self)
+        return self._menu_handler
 
     def _configure_logging(self):
-        """Configure logging settings"""
-        logging.basicConfig(
-            filename='bot.log',
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
+        """Write JSON-lines logs from a background thread, rotating and compressing them"""
+        setup_logging(
+            os.getenv('LOG_FILE', 'bot.log'),
+            level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+            max_bytes=int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+            backup_count=int(os.getenv('LOG_BACKUP_COUNT', '10')),
+            rotate_seconds=float(os.getenv('LOG_ROTATE_HOURS', '24')) * 3600
         )
 
     def _load_environment(self):
         """Load environment variables"""
         load_dotenv()
-        self.api_key = os.getenv('API_KEY')
-        self.api_key_secret = os.getenv('API_KEY_SECRET')
-        self.access_token = os.getenv('ACCESS_TOKEN')
-        self.access_token_secret = os.getenv('ACCESS_TOKEN_SECRET')
-        self.bearer_token = os.getenv('BEARER_TOKEN')  # Add Bearer Token
+        if self.traffic is not None and self.traffic.replay:
+            # Replayed responses do not need real credentials
+            for name in CREDENTIAL_NAMES + ('OPENAI_API_KEY',):
+                os.environ.setdefault(name, '1-replay' if name == 'ACCESS_TOKEN' else 'replay')
+        credentials = self.account.credentials if self.account else {name: os.getenv(name) for name in CREDENTIAL_NAMES}
+        self.api_key = credentials.get('API_KEY')
+        self.api_key_secret = credentials.get('API_KEY_SECRET')
+        self.access_token = credentials.get('ACCESS_TOKEN')
+        self.access_token_secret = credentials.get('ACCESS_TOKEN_SECRET')
+        self.bearer_token = credentials.get('BEARER_TOKEN')  # Add Bearer Token
+        self.api_base_url = os.getenv('X_API_BASE_URL')  # e.g. a local mock_api.py server
+        self.http_config = HttpPoolConfig.from_env()
+        # Posts at least this similar to an earlier one are not sent; 0 turns the check off
+        self.duplicate_threshold = float(os.getenv('DUPLICATE_THRESHOLD', '0.8'))
         
         if not all([self.api_key, self.api_key_secret, self.access_token, 
                     self.access_token_secret, self.bearer_token]):
+            if self.account:
+                raise ValueError(f"Missing required Twitter API credentials for account {self.account.name}")
             raise ValueError("Missing required Twitter API credentials in .env file")
 
     def _initialize_client(self):
         """Initialize Twitter API client"""
+        import tweepy
         try:
-            self.client = tweepy.Client(
+            # Every API method call is timed and counted in METRICS
+            labels = {'account': self.account.name} if self.account else {}
+            client = InstrumentedClient(tweepy.Client(
                 bearer_token=self.bearer_token,
                 consumer_key=self.api_key,
                 consumer_secret=self.api_key_secret,
                 access_token=self.access_token,
                 access_token_secret=self.access_token_secret,
-                wait_on_rate_limit=True
-            )
-            me = self.client.get_me()
-            logging.info(f"Authentication successful for user @{me.data.username}")
-            print(f"Authentication successful for user @{me.data.username}")
+                wait_on_rate_limit=False
+            ), **labels)
+            # Pool, timeouts and retries go on before the rate limiter hooks the session
+            configure_session(client.session, self.http_config)
+            if self.api_base_url:
+                from mock_api import redirect_client
+                redirect_client(client, self.api_base_url, self.http_config)
+            if self.traffic is not None:
+                self.traffic.attach_session(client.session)
+            self.rate_limiter.attach(client)
+            username = self._verify_identity(client)
+            logging.info(f"Authentication successful for user @{username}")
+            print(f"Authentication successful for user @{username}")
+            self._client = client
         except tweepy.errors.Unauthorized as e:
+            self._forget_identity()
             error_msg = f"Authentication failed: {str(e)}\nPlease verify your credentials."
             logging.error(error_msg)
             raise ValueError(error_msg)
@@ -64,10 +159,48 @@ class TwitterBot:
             logging.error(f"Error during authentication: {e}")
             raise
 
+    def _identity_key(self):
+        credentials = f"{self.api_base_url}:{self.api_key}:{self.access_token}"
+        return hashlib.sha256(credentials.encode('utf-8')).hexdigest()
+
+    def _verify_identity(self, client):
+        """Return the authenticated username, calling get_me() only if the cached one is stale
+
+        The result is kept in identity_cache.json for IDENTITY_TTL seconds, keyed
+        on a hash of the credentials so changing them forces a new check.
+        """
+        try:
+            with open(self.identity_cache) as f:
+                cached = json.load(f)
+            if cached['key'] == self._identity_key() and time.time() - cached['verified_at'] < IDENTITY_TTL:
+                return cached['username']
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        me = client.get_me()
+        cached = {'key': self._identity_key(), 'id': str(me.data.id),
+                  'username': me.data.username, 'verified_at': time.time()}
+        try:
+            with open(self.identity_cache, 'w') as f:
+                json.dump(cached, f)
+        except OSError as e:
+            logging.warning(f"Could not write {self.identity_cache}: {e}")
+        return me.data.username
+
+    def _forget_identity(self):
+        try:
+            os.remove(self.identity_cache)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _today_start():
+        return datetime.combine(datetime.now().date(), datetime.min.time()).timestamp()
+
     def _initialize_llm(self):
         """Initialize LLM handler"""
+        from llm_handler import LLMHandler
         try:
-            self.llm = LLMHandler()
+            self._llm = LLMHandler(http_config=self.http_config, traffic=self.traffic)
             logging.info("LLM handler initialized successfully")
         except Exception as e:
             logging.error(f"Error initializing LLM handler: {e}")
@@ -80,41 +213,90 @@ class TwitterBot:
             tweet_text = input("Enter your tweet: ")
         
         if tweet_text:
-            try:
-                response = self.client.create_tweet(text=tweet_text)
-                tweet_id = response.data['id']
-                logging.info(f"Manual Tweeted (ID: {tweet_id}): {tweet_text}")
-                print("Tweet sent successfully.")
-                return True
-            except tweepy.errors.Forbidden as e:
-                if "453" in str(e):
-                    logging.error("API access level error. Please check your API access tier.")
-                    print("API access level error. Please verify your API credentials and access level.")
-                else:
-                    logging.error(f"Forbidden error: {e}")
-                    print(f"Forbidden error: {e}")
-            except tweepy.errors.HTTPException as e:
-                logging.error(f"Error sending manual tweet: {e}")
-                print(f"Error: {e}")
-            return False
+            post_id = self.outbox.enqueue(tweet_text)
+            return self.deliver_post(post_id)
         else:
             print("Tweet content cannot be empty.")
             return False
 
-    def load_tweets_from_csv(self, csv_filename):
-        """Load tweets from CSV file"""
-        tweets_list = []
+    def deliver_post(self, post_id):
+        """Send a post from the outbox and record the outcome
+
+        Returns True once the post is confirmed sent (including when it was
+        already sent before), False if it should be retried and None if it
+        was rejected for good (a near-duplicate), so the scheduler drops it.
+        The scheduler retries no sooner than rate_limiter.next_available
+        allows, so an exhausted budget or daily cap is waited out.
+        """
+        entry = self.outbox.claim(post_id)
+        if entry is None:
+            return True
+        tweet_text = entry['text']
+        retry = entry['due'] is not None
+        match = self.history.check(tweet_text) if self.duplicate_threshold > 0 else None
+        if match is not None:
+            self.outbox.mark_failed(post_id, f"near-duplicate of post {match.tweet_id or match.post_id}", retry=False)
+            log_event('post', 'duplicate', None, None, None, "Not sending near-duplicate (%.0f%% similar to %r): %s",
+                      match.similarity * 100, match.text, tweet_text, level=logging.WARNING)
+            print(f"Not sent: {match.similarity:.0%} similar to an earlier post: {match.text[:80]}")
+            return None
+        if not self.rate_limiter.acquire('create_tweet'):
+            wait = self.rate_limiter.next_available('create_tweet')
+            next_slot = datetime.fromtimestamp(datetime.now().timestamp() + wait).strftime('%Y-%m-%d %H:%M')
+            self.outbox.mark_failed(post_id, "rate budget exhausted", retry=retry)
+            log_event('post', 'rate_limited', None, 'create_tweet', None, "Tweet budget exhausted, next tweet possible at %s",
+                      next_slot, level=logging.WARNING)
+            print(f"Tweet limit reached. Next tweet possible at {next_slot}.")
+            return False
+        import tweepy
         try:
-            with open(csv_filename, mode='r', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    tweet_text = row['Tweet Text'].strip()
-                    hashtags = [row[f'Hashtag{i}'].strip() for i in range(1, 5) 
-                              if row.get(f'Hashtag{i}') and row[f'Hashtag{i}'].strip()]
-                    full_tweet = f"{tweet_text} {' '.join(hashtags)}" if hashtags else tweet_text
-                    tweets_list.append(full_tweet)
-            logging.info(f"Loaded {len(tweets_list)} tweets from {csv_filename}")
-            return tweets_list
+            response = self.client.create_tweet(text=tweet_text)
+            tweet_id = response.data['id']
+            self.outbox.mark_sent(post_id, tweet_id)
+            self.history.add(tweet_text, tweet_id)
+            log_event('post', 'ok', tweet_id, 'create_tweet', None, "Tweeted: %s", tweet_text)
+            print("Tweet sent successfully.")
+            return True
+        except tweepy.errors.Forbidden as e:
+            if "duplicate" in str(e).lower():
+                # An earlier attempt went through before we could record it
+                self.outbox.mark_sent(post_id)
+                self.history.add(tweet_text)
+                log_event('post', 'already_sent', None, 'create_tweet', None, "Tweet already posted, marking as sent: %s", tweet_text)
+                return True
+            self.outbox.mark_failed(post_id, e, retry=retry)
+            if "453" in str(e):
+                log_event('post', 'error', None, 'create_tweet', None, "API access level error. Please check your API access tier.",
+                          level=logging.ERROR)
+                print("API access level error. Please verify your API credentials and access level.")
+            else:
+                log_event('post', 'error', None, 'create_tweet', None, "Forbidden error: %s", e, level=logging.ERROR)
+                print(f"Forbidden error: {e}")
+        except tweepy.errors.TooManyRequests as e:
+            self.outbox.mark_failed(post_id, e, retry=retry)
+            wait = self.rate_limiter.next_available('create_tweet')
+            log_event('post', 'rate_limited', None, 'create_tweet', None, "Rate limited sending tweet, next slot in %.0fs", wait,
+                      level=logging.ERROR)
+            print(f"Rate limit reached. Try again in {wait / 60:.0f} minutes.")
+        except tweepy.errors.HTTPException as e:
+            self.outbox.mark_failed(post_id, e, retry=retry)
+            log_event('post', 'error', None, 'create_tweet', None, "Error sending tweet: %s", e, level=logging.ERROR)
+            print(f"Error: {e}")
+        return False
+
+    def iter_tweets_from_csv(self, csv_filename, start_row=0):
+        """Lazily yield TweetRow tuples from a CSV file, starting at data row start_row
+
+        Invalid rows are skipped and reported per row rather than aborting
+        the whole load.
+        """
+        reader = TweetCsvReader(csv_filename)
+        count = 0
+        try:
+            for row in reader.iter_rows(start_row):
+                count += 1
+                yield row
+            logging.info(f"Loaded {count} tweets from {csv_filename}")
         except FileNotFoundError:
             logging.error(f"CSV file {csv_filename} not found.")
             print(f"Error: CSV file {csv_filename} not found.")
@@ -124,54 +306,214 @@ class TwitterBot:
         except Exception as e:
             logging.error(f"Error reading CSV file: {e}")
             print(f"Error reading CSV file: {e}")
-        return []
+        if reader.errors:
+            print(f"Skipped {len(reader.errors)} invalid rows in {csv_filename}:")
+            for error in reader.errors[:10]:
+                print(f"  row {error.row_number + 1}: {error.message}")
+            if len(reader.errors) > 10:
+                print("  ... see bot.log for the rest")
 
-    def schedule_tweets(self, tweets):
-        """Schedule tweets for posting"""
-        if not tweets:
-            print("No tweets to schedule.")
-            return
+    def precheck_csv(self, csv_filename, start_row=0, threshold=None):
+        """Find CSV rows that repeat an earlier post or an earlier row
 
-        tweet_index = 0
+        Returns a list of (TweetRow, Match) and prints a short report;
+        nothing is scheduled or recorded.
+        """
+        # Rows are streamed; only row numbers (for naming the earlier row of a match) and the duplicates are kept
+        row_numbers = array('q')
+        current = None
 
-        def job():
-            nonlocal tweet_index
-            if tweet_index < len(tweets):
-                if self.send_manual_tweet(tweets[tweet_index]):
-                    tweet_index += 1
+        def texts():
+            nonlocal current
+            for current in self.iter_tweets_from_csv(csv_filename, start_row):
+                row_numbers.append(current.row_number)
+                yield current.text
+
+        threshold = threshold if threshold is not None else (self.duplicate_threshold or 0.8)
+        # precheck yields a match right after reading its text, so current is the matching row
+        duplicates = [(current, match) for _, _, match in self.history.precheck(texts(), threshold)]
+        print(f"Checked {len(row_numbers)} rows: {len(duplicates)} near-duplicates.")
+        for row, match in duplicates[:10]:
+            if match.post_id is None:
+                source = f"row {row_numbers[match.batch_index] + 1}"
             else:
-                print("All scheduled tweets have been posted.")
-                logging.info("All scheduled tweets have been posted.")
-                schedule.clear()
+                source = "an earlier post"
+            print(f"  row {row.row_number + 1} is {match.similarity:.0%} similar to {source}: {match.text[:60]}")
+        if len(duplicates) > 10:
+            print(f"  ... and {len(duplicates) - 10} more")
+        return duplicates
 
-        schedule.every(2).hours.do(job)
-        print(f"Scheduled {len(tweets)} tweets to be posted every 2 hours.")
-        logging.info(f"Scheduled {len(tweets)} tweets to be posted every 2 hours.")
+    def load_tweets_from_csv(self, csv_filename):
+        """Load tweets from CSV file as a list of TweetRow tuples"""
+        return list(self.iter_tweets_from_csv(csv_filename))
 
-        try:
-            while tweet_index < len(tweets):
-                schedule.run_pending()
-                time.sleep(1)
-        except KeyboardInterrupt:
-            print("\nScheduler stopped by user")
-            logging.info("Scheduler stopped by user")
-            schedule.clear()
+    @staticmethod
+    def _as_tweet_row(index, tweet):
+        if isinstance(tweet, TweetRow):
+            return tweet
+        if isinstance(tweet, tuple):
+            return TweetRow(index, *tweet)
+        return TweetRow(index, tweet, None)
+
+    def schedule_tweets(self, tweets, interval_hours=2, jitter_minutes=0, window=None, source=None):
+        """Queue tweets on the background scheduler
+
+        tweets may be any iterable (including a lazy CSV stream) of text,
+        (text, post_at) tuples or TweetRow tuples; it is consumed in batches.
+        Tweets without an explicit time are spaced interval_hours apart,
+        shifted by up to +/- jitter_minutes and pushed into the optional
+        posting window (e.g. "mon-fri 09:00-17:00"; None posts at any time).
+        Every tweet is written to the outbox first; when a source name is
+        given, rows are keyed on (source, row number, text) so scheduling the
+        same file twice never queues a row again, and the outbox remembers
+        how far into the source we got. Returns immediately; posting happens on the scheduler thread.
+        """
+        self.scheduler.interval = interval_hours * 3600
+        self.scheduler.retry_delay = self.scheduler.interval
+        self.scheduler.jitter = jitter_minutes * 60
+        self.scheduler.window = PostingWindow.parse(window) if isinstance(window, str) else window
+
+        count = 0
+        total = 0
+        tweets = iter(tweets)
+        while True:
+            batch = [self._as_tweet_row(total + i, tweet)
+                     for i, tweet in enumerate(itertools.islice(tweets, self.SCHEDULE_BATCH))]
+            if not batch:
+                break
+            total += len(batch)
+            entries = []
+            for row in batch:
+                key = make_key(source, row.row_number, row.text) if source else None
+                at = row.post_at.timestamp() if row.post_at else datetime.now().timestamp()
+                entries.append((key, row.text, at))
+            post_ids = self.outbox.enqueue_many(entries)
+
+            for post_id, row in zip(post_ids, batch):
+                if post_id in self.scheduler or self.outbox.get(post_id)['status'] in ('sent', 'failed'):
+                    continue
+                due = self.scheduler.plan(row.post_at)
+                self.outbox.set_due(post_id, due)
+                self.scheduler.push(post_id, due)
+                count += 1
+            if source:
+                self.outbox.set_progress(source, batch[-1].row_number + 1)
+
+        if not total:
+            print("No tweets to schedule.")
+            return
+        self.scheduler.start()
+
+        if not count:
+            print("All of these tweets have already been posted or queued.")
+            return
+        # The scheduler thread may already have sent (or dropped) everything that was due
+        next_due = self.scheduler.next_due()
+        next_at = f" (next at {datetime.fromtimestamp(next_due).strftime('%Y-%m-%d %H:%M')})" if next_due else ""
+        print(f"Scheduled {count} tweets to be posted every {interval_hours} hours{next_at}.")
+        logging.info(f"Scheduled {count} tweets to be posted every {interval_hours} hours.")
+
+    def resume_outbox(self):
+        """Re-queue scheduled tweets left unsent by a previous run
+
+        Tweets whose due time has already passed are re-spaced on the
+        scheduler interval instead of all being posted at once.
+        """
+        unsent = self.outbox.unsent()
+        now = datetime.now().timestamp()
+        for entry in unsent:
+            due = entry['due'] if entry['due'] > now else self.scheduler.plan()
+            self.scheduler.push(entry['id'], due)
+        if unsent:
+            self.scheduler.start()
+            print(f"Resumed {len(unsent)} unsent scheduled tweets.")
+            logging.info(f"Resumed {len(unsent)} unsent scheduled tweets from the outbox")
+        return len(unsent)
 
     def run(self):
         """Start the bot"""
+        self.client  # verify credentials before showing the menu
         print("Bot is running...")
         logging.info("Bot started.")
+        unsent = len(self.outbox.unsent())
+        if unsent and input(f"Resume {unsent} unsent scheduled tweets from the last run? (y/n): ").lower() == 'y':
+            self.resume_outbox()
         try:
             self.menu_handler.run_main_menu()
         except KeyboardInterrupt:
             print("\nBot stopped by user")
             logging.info("Bot stopped by user")
-            schedule.clear()
+        finally:
+            pending = self.scheduler.pending()
+            if pending:
+                print(f"{pending} scheduled tweets are saved in the outbox and can be resumed on next start.")
+                logging.info(f"Scheduler stopped with {pending} tweets pending")
+            self.close()
+
+    def close(self):
+        """Stop the scheduler and flush the outbox"""
+        self.scheduler.stop()
+        self.outbox.close()
+        self.history.close()
+        if self.traffic is not None:
+            self.traffic.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="X bot")
+    parser.add_argument('--daemon', metavar='CONFIG',
+                        help="run the scheduler and automations unattended using a TOML config")
+    parser.add_argument('--accounts', metavar='CONFIG',
+                        help="run the daemon for every account in a TOML config, sharded across processes")
+    parser.add_argument('--workers', type=int, metavar='N',
+                        help="worker processes for --accounts (default: one per CPU)")
+    parser.add_argument('--tweet', metavar='TEXT',
+                        help="post TEXT and exit (exit status 1 if it could not be sent)")
+    parser.add_argument('--check-csv', metavar='FILE',
+                        help="report rows of FILE that repeat earlier posts or rows, then exit")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument('--metrics-file', metavar='FILE',
+                        help="write Prometheus metrics to FILE every 15 seconds")
+    parser.add_argument('--record', metavar='FILE', nargs='?', const='traffic.jsonl',
+                        help="append every X and OpenAI request/response to FILE (default traffic.jsonl)")
+    parser.add_argument('--replay', metavar='FILE', nargs='?', const='traffic.jsonl',
+                        help="answer X and OpenAI requests from a recording instead of the network")
+    parser.add_argument('--replay-speed', type=float, default=10.0, metavar='X',
+                        help="replay recorded latencies X times faster (0 for no delay, default 10)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
+    args = parse_args()
+    if args.accounts:
+        from accounts import run_accounts
+        run_accounts(args.accounts, args.workers)
+        sys.exit(0)
+    if args.metrics_port:
+        METRICS.start_http_server(args.metrics_port)
+    if args.metrics_file:
+        METRICS.start_textfile_writer(args.metrics_file)
+    traffic = None
+    if args.replay:
+        from traffic import TrafficReplayer
+        traffic = TrafficReplayer(args.replay, args.replay_speed)
+    elif args.record:
+        from traffic import TrafficRecorder
+        traffic = TrafficRecorder(args.record)
     try:
-        bot = TwitterBot()
-        bot.run()
+        bot = TwitterBot(traffic=traffic)
+        if args.tweet is not None:
+            sent = bot.send_manual_tweet(args.tweet)
+            bot.close()
+            sys.exit(0 if sent else 1)
+        if args.check_csv:
+            duplicates = bot.precheck_csv(args.check_csv)
+            bot.close()
+            sys.exit(1 if duplicates else 0)
+        if args.daemon:
+            from daemon import BotDaemon
+            BotDaemon.from_file(bot, args.daemon).run()
+        else:
+            bot.run()
     except Exception as e:
         logging.error(f"Fatal error: {e}")
         print(f"Fatal error: {e}")
\ No newline at end of file
@@ -0,0 +1,221 @@
+import csv
+import logging
+import os
+import struct
+from collections import namedtuple
+from datetime import datetime
+
+TweetRow = namedtuple('TweetRow', ['row_number', 'text', 'post_at'])
+RowError = namedtuple('RowError', ['row_number', 'message'])
+
+INDEX_MAGIC = b'TWIDX1\0\0'
+INDEX_HEADER = struct.Struct('<8sQQ')
+OFFSET = struct.Struct('<Q')
+REQUIRED_COLUMNS = ['Tweet Text']
+CSV_COLUMNS = ['Tweet Text', 'Hashtag1', 'Hashtag2', 'Hashtag3', 'Hashtag4']
+
+
+def format_row(row):
+    """Turn a CSV row dict into (text, post_at), raising ValueError if it is invalid"""
+    tweet_text = (row.get('Tweet Text') or '').strip()
+    if not tweet_text:
+        raise ValueError("empty 'Tweet Text'")
+    hashtags = [row[f'Hashtag{i}'].strip() for i in range(1, 5)
+                if row.get(f'Hashtag{i}') and row[f'Hashtag{i}'].strip()]
+    full_tweet = f"{tweet_text} {' '.join(hashtags)}" if hashtags else tweet_text
+    post_at = (row.get('Post At') or '').strip()
+    try:
+        post_at = datetime.fromisoformat(post_at) if post_at else None
+    except ValueError:
+        raise ValueError(f"invalid 'Post At' value {post_at!r}")
+    return full_tweet, post_at
+
+
+def split_hashtags(tweet):
+    """Split trailing hashtags off a tweet, returning (text, [up to 4 hashtags])"""
+    words = tweet.split()
+    hashtags = []
+    while words and words[-1].startswith('#') and len(hashtags) < 4:
+        hashtags.insert(0, words.pop())
+    return ' '.join(words), hashtags
+
+
+class TweetCsvWriter:
+    """Append tweets to a CSV in the format read by TweetCsvReader"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        write_header = not os.path.exists(filename) or os.path.getsize(filename) == 0
+        if not write_header:
+            with open(filename, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) not in (b'\n', b'\r')
+        self._file = open(filename, 'a', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        if not write_header and needs_newline:
+            self._file.write('\n')
+        if write_header:
+            self._writer.writerow(CSV_COLUMNS)
+
+    def write(self, tweet):
+        text, hashtags = split_hashtags(tweet)
+        self._writer.writerow([text] + hashtags + [''] * (4 - len(hashtags)))
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TweetCsvReader:
+    """Streaming reader for tweet CSV files with a sidecar row-offset index.
+
+    Rows are parsed lazily, one record at a time, so memory use does not grow
+    with the file. The first time a caller needs to start part-way through
+    the file, a <file>.idx sidecar holding the byte offset of every record is
+    written; later reads seek straight to row N without parsing the rows
+    before it. The index is rebuilt whenever the CSV's size or mtime changes.
+    """
+
+    def __init__(self, filename, index_filename=None):
+        self.filename = filename
+        self.index_filename = index_filename or f"{filename}.idx"
+        self.errors = []
+        self._header = None
+        self._data_start = None
+
+    def _stamp(self):
+        st = os.stat(self.filename)
+        return st.st_size, st.st_mtime_ns
+
+    @staticmethod
+    def _records(f):
+        r"""Yield (offset, raw_bytes) per CSV record, keeping quoted newlines together
+
+        Record boundaries come from csv.reader itself, fed one line at a
+        time, so a quote inside an unquoted field (5" screen) is a literal
+        character exactly as csv treats it, not the start of a quoted field:
+
+        >>> import io
+        >>> data = b'My 5" screen is great,#a\nNext,#b\n"two\nlines",#c\nLast,#d\n'
+        >>> [offset for offset, _ in TweetCsvReader._records(io.BytesIO(data))]
+        [0, 25, 33, 48]
+        """
+        lines = []
+
+        def line_source():
+            while True:
+                line = f.readline()
+                if not line:
+                    return
+                lines.append(line)
+                yield line.decode('utf-8', errors='replace')
+
+        offset = f.tell()
+        reader = csv.reader(line_source())
+        while True:
+            try:
+                next(reader)
+            except StopIteration:
+                pass
+            except csv.Error:
+                pass  # the malformed record is still yielded; the caller reports it
+            if not lines:
+                return
+            record = b''.join(lines)
+            lines.clear()
+            yield offset, record
+            offset += len(record)
+
+    def _read_header(self, f):
+        if f.read(3) != b'\xef\xbb\xbf':
+            f.seek(0)
+        for offset, record in self._records(f):
+            if record.strip():
+                self._header = next(csv.reader([record.decode('utf-8')]))
+                self._header = [name.strip() for name in self._header]
+                self._data_start = f.tell()
+                missing = [c for c in REQUIRED_COLUMNS if c not in self._header]
+                if missing:
+                    raise KeyError(', '.join(missing))
+                return
+        raise ValueError(f"CSV file {self.filename} is empty")
+
+    def index_is_current(self):
+        try:
+            with open(self.index_filename, 'rb') as f:
+                magic, size, mtime = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+        except (OSError, struct.error):
+            return False
+        return magic == INDEX_MAGIC and (size, mtime) == self._stamp()
+
+    def build_index(self):
+        """Write the sidecar index and return the number of data rows"""
+        size, mtime = self._stamp()
+        count = 0
+        tmp_filename = f"{self.index_filename}.tmp"
+        with open(self.filename, 'rb') as f, open(tmp_filename, 'wb') as out:
+            self._read_header(f)
+            f.seek(self._data_start)
+            out.write(INDEX_HEADER.pack(INDEX_MAGIC, size, mtime))
+            for offset, record in self._records(f):
+                if record.strip():
+                    out.write(OFFSET.pack(offset))
+                    count += 1
+        os.replace(tmp_filename, self.index_filename)
+        logging.info(f"Indexed {count} rows of {self.filename}")
+        return count
+
+    def _ensure_index(self):
+        if not self.index_is_current():
+            self.build_index()
+
+    def row_count(self):
+        """Return the number of data rows, using the index"""
+        self._ensure_index()
+        return (os.path.getsize(self.index_filename) - INDEX_HEADER.size) // OFFSET.size
+
+    def offset_of(self, row_number):
+        """Return the byte offset of a data row (0-based), or None past the end"""
+        self._ensure_index()
+        with open(self.index_filename, 'rb') as f:
+            f.seek(INDEX_HEADER.size + row_number * OFFSET.size)
+            data = f.read(OFFSET.size)
+        return OFFSET.unpack(data)[0] if data else None
+
+    def __iter__(self):
+        return self.iter_rows()
+
+    def iter_rows(self, start_row=0):
+        """Yield TweetRow tuples lazily, starting at data row start_row
+
+        Invalid rows are skipped; each one is logged and appended to
+        self.errors as a RowError instead of aborting the load.
+        """
+        with open(self.filename, 'rb') as f:
+            self._read_header(f)
+            if start_row:
+                offset = self.offset_of(start_row)
+                if offset is None:
+                    return
+                f.seek(offset)
+            row_number = start_row
+            for _, record in self._records(f):
+                if not record.strip():
+                    continue
+                try:
+                    values = next(csv.reader([record.decode('utf-8')]))
+                    if len(values) > len(self._header):
+                        raise ValueError(f"expected {len(self._header)} columns, got {len(values)}")
+                    text, post_at = format_row(dict(zip(self._header, values)))
+                except (ValueError, UnicodeDecodeError, csv.Error) as e:
+                    error = RowError(row_number, str(e))
+                    self.errors.append(error)
+                    logging.warning("Skipping row %d of %s: %s", row_number, self.filename, e)
+                else:
+                    yield TweetRow(row_number, text, post_at)
+                row_number += 1
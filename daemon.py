@@ -0,0 +1,133 @@
+import logging
+import signal
+import threading
+import tomllib
+
+from metrics import METRICS, profiled
+
+
+class BotDaemon:
+    """Runs the scheduler and automations unattended in one process.
+
+    Each enabled job from the TOML config runs on its own worker thread,
+    sharing the bot's client, rate limiter, outbox and LLM handler. SIGTERM
+    or SIGINT sets a shared stop event; every job checks it between waits,
+    so shutdown is prompt and the outbox is flushed before exit.
+
+    See daemon.example.toml for the config format.
+    """
+
+    def __init__(self, bot, config, stop_event=None, name=None):
+        self.bot = bot
+        self.config = config
+        # Several daemons (one per account) can share a stop event and run in one process
+        self.stop_event = stop_event or threading.Event()
+        self.name = name
+        self.threads = []
+        self.metrics_server = None
+        self.profile_dir = config.get('metrics', {}).get('profile_dir')
+
+    @classmethod
+    def from_file(cls, bot, config_filename):
+        with open(config_filename, 'rb') as f:
+            return cls(bot, tomllib.load(f))
+
+    def _start(self, name, target, *args):
+        if self.name:
+            name = f"{self.name}:{name}"
+
+        def run():
+            logging.info(f"Daemon job {name} started")
+            try:
+                with profiled(name, self.profile_dir):
+                    target(*args)
+            except Exception as e:
+                logging.error(f"Daemon job {name} crashed: {e}")
+            logging.info(f"Daemon job {name} stopped")
+
+        thread = threading.Thread(target=run, name=name, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def _start_scheduler(self, section):
+        self.bot.resume_outbox()
+        csv_filename = section.get('csv')
+        if csv_filename:
+            start_row = self.bot.outbox.progress(csv_filename)
+            self.bot.schedule_tweets(
+                self.bot.iter_tweets_from_csv(csv_filename, start_row),
+                interval_hours=section.get('interval_hours', 2),
+                jitter_minutes=section.get('jitter_minutes', 0),
+                window=section.get('window'),
+                source=csv_filename
+            )
+        self.bot.scheduler.start()
+
+    def _run_summaries(self, section):
+        interval = section.get('interval_hours', 24) * 3600
+        while not self.stop_event.is_set():
+            try:
+                summary = self.bot.automated.summarize(
+                    section['keywords'],
+                    hours=section.get('interval_hours', 24),
+                    max_pages=section.get('max_pages', 20)
+                )
+                if summary:
+                    logging.info("Daemon summary: %s", summary)
+                    if section.get('post', False):
+                        self.bot.automated._post(summary)
+            except Exception as e:
+                logging.error("Error creating summary: %s", e)
+            if self.stop_event.wait(interval):
+                break
+
+    def _handle_signal(self, signum, frame):
+        logging.info(f"Received signal {signum}, shutting down")
+        self.stop_event.set()
+
+    def start(self):
+        """Start every configured job on its own thread and return"""
+        automated = self.bot.automated
+        if 'scheduler' in self.config:
+            self._start_scheduler(self.config['scheduler'])
+        if 'polling' in self.config:
+            automated.poller.configure(**self.config['polling'])
+        like = self.config.get('auto_like', {})
+        if like.get('enabled', True) and like.get('keywords'):
+            self._start('auto-like', automated.run_auto_like, like['keywords'], self.stop_event)
+        retweet = self.config.get('auto_retweet', {})
+        if retweet.get('enabled', False):
+            self._start('auto-retweet', automated.run_auto_retweet, self.stop_event)
+        summary = self.config.get('summary', {})
+        if summary.get('enabled', True) and summary.get('keywords'):
+            self._start('summary', self._run_summaries, summary)
+        prefix = f"{self.name}: " if self.name else ""
+        print(f"{prefix}Daemon running {len(self.threads)} jobs (scheduler: {self.bot.scheduler.is_running()}).")
+        logging.info(f"{prefix}Daemon started")
+
+    def run(self):
+        """Start every configured job and block until a shutdown signal"""
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+
+        metrics = self.config.get('metrics', {})
+        if metrics.get('port'):
+            self.metrics_server = METRICS.start_http_server(metrics['port'], metrics.get('host', '127.0.0.1'))
+        if metrics.get('textfile'):
+            METRICS.start_textfile_writer(metrics['textfile'], metrics.get('interval', 15), self.stop_event)
+        self.start()
+        print("Send SIGTERM to stop.")
+        # The timeout only guards platforms where a signal cannot interrupt the wait
+        while not self.stop_event.wait(60):
+            pass
+        self.shutdown()
+
+    def shutdown(self, timeout=10):
+        self.stop_event.set()
+        self.bot.scheduler.stop(timeout)
+        for thread in self.threads:
+            thread.join(timeout)
+        self.bot.close()
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+        logging.info(f"{self.name + ': ' if self.name else ''}Daemon stopped")
@@ -0,0 +1,126 @@
+import logging
+import os
+
+import requests
+from urllib3.util.retry import Retry
+
+
+class HttpPoolConfig:
+    """Connection pool, keep-alive, timeout and retry settings shared by every API client.
+
+    The same settings size the requests session behind tweepy and the httpx
+    clients behind OpenAI, so a burst of likes, retweets or generations
+    reuses warm keep-alive connections instead of opening new ones.
+    Retries only cover connection failures and 5xx on idempotent requests;
+    429s are left to the rate limiter and the LLM batch backoff.
+    """
+
+    def __init__(self, max_connections=20, max_keepalive=10, keepalive_expiry=30.0,
+                 connect_timeout=5.0, read_timeout=30.0, retries=3, backoff_factor=0.5, http2=False):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.http2 = http2
+
+    @classmethod
+    def from_env(cls):
+        """Build a config from HTTP_* environment variables, falling back to the defaults"""
+        defaults = cls()
+        return cls(
+            max_connections=int(os.getenv('HTTP_MAX_CONNECTIONS', defaults.max_connections)),
+            max_keepalive=int(os.getenv('HTTP_MAX_KEEPALIVE', defaults.max_keepalive)),
+            keepalive_expiry=float(os.getenv('HTTP_KEEPALIVE_EXPIRY', defaults.keepalive_expiry)),
+            connect_timeout=float(os.getenv('HTTP_CONNECT_TIMEOUT', defaults.connect_timeout)),
+            read_timeout=float(os.getenv('HTTP_READ_TIMEOUT', defaults.read_timeout)),
+            retries=int(os.getenv('HTTP_RETRIES', defaults.retries)),
+            http2=os.getenv('HTTP2', '').lower() in ('1', 'true', 'yes'),
+        )
+
+    def retry(self):
+        return Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(500, 502, 503, 504),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+
+
+class PooledAdapter(requests.adapters.HTTPAdapter):
+    """HTTPAdapter with a sized pool, retries and a default timeout for every request"""
+
+    def __init__(self, config=None, **kwargs):
+        # HTTPAdapter already uses self.config for its own settings
+        self.pool_config = config or HttpPoolConfig()
+        kwargs.setdefault('pool_connections', 4)
+        kwargs.setdefault('pool_maxsize', self.pool_config.max_connections)
+        kwargs.setdefault('max_retries', self.pool_config.retry())
+        super().__init__(**kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = (self.pool_config.connect_timeout, self.pool_config.read_timeout)
+        return super().send(request, timeout=timeout, **kwargs)
+
+
+def configure_session(session, config=None):
+    """Mount a PooledAdapter for http and https on a requests session (e.g. tweepy's client.session)"""
+    adapter = PooledAdapter(config)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def _http2_enabled(config):
+    if not config.http2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logging.warning("HTTP2 requested but the h2 package is not installed; using HTTP/1.1")
+        return False
+
+
+def _httpx_settings(config):
+    import httpx
+    limits = httpx.Limits(
+        max_connections=config.max_connections,
+        max_keepalive_connections=config.max_keepalive,
+        keepalive_expiry=config.keepalive_expiry,
+    )
+    timeout = httpx.Timeout(config.read_timeout, connect=config.connect_timeout)
+    return limits, timeout, _http2_enabled(config)
+
+
+def make_http_client(config=None, traffic=None):
+    """Return a pooled httpx.Client for openai.OpenAI(http_client=...)
+
+    traffic is an optional traffic.TrafficRecorder or TrafficReplayer.
+    """
+    import httpx
+    config = config or HttpPoolConfig()
+    limits, timeout, http2 = _httpx_settings(config)
+    # Transport-level retries only cover failed connection attempts
+    transport = httpx.HTTPTransport(limits=limits, http2=http2, retries=config.retries)
+    if traffic is not None:
+        transport = traffic.transport(transport)
+    return httpx.Client(transport=transport, limits=limits, timeout=timeout, http2=http2)
+
+
+def make_async_http_client(config=None, traffic=None):
+    """Return a pooled httpx.AsyncClient for openai.AsyncOpenAI(http_client=...)"""
+    import httpx
+    config = config or HttpPoolConfig()
+    limits, timeout, http2 = _httpx_settings(config)
+    transport = httpx.AsyncHTTPTransport(limits=limits, http2=http2, retries=config.retries)
+    if traffic is not None:
+        transport = traffic.async_transport(transport)
+    return httpx.AsyncClient(transport=transport, limits=limits, timeout=timeout, http2=http2)
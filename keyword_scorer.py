@@ -0,0 +1,176 @@
+import bisect
+import itertools
+import math
+import re
+import time
+from collections import deque
+
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Lower-case word tokens; # and @ are dropped so "python" also matches #python"""
+    return TOKEN_RE.findall(text.lower())
+
+
+class AhoCorasick:
+    """Multi-pattern matcher: finds every occurrence of any pattern in one pass over the text.
+
+    Runs over word tokens rather than characters, so patterns only match as
+    whole words or phrases ("py" does not match inside "happy") and each
+    step consumes a whole word. Matching is case-insensitive and its cost
+    depends on the text length, not on how many patterns there are.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = [tuple(tokenize(p)) for p in patterns]
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for index, pattern in enumerate(self.patterns):
+            node = 0
+            for word in pattern:
+                next_node = self._goto[node].get(word)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][word] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = next_node
+            if pattern:
+                self._out[node].append(index)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for word, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(word, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text):
+        """Yield (word position, pattern index) for every match in text"""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for position, word in enumerate(tokenize(text)):
+            while node and word not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(word, 0)
+            for index in out[node]:
+                yield position - len(self.patterns[index]) + 1, index
+
+
+def parse_keywords(entries):
+    """Split user input into (keywords, exclusions); entries starting with - are exclusions"""
+    keywords, exclusions = [], []
+    for entry in entries:
+        entry = entry.strip()
+        if entry.startswith('-') and len(entry) > 1:
+            exclusions.append(entry[1:].strip())
+        elif entry:
+            keywords.append(entry)
+    return keywords, exclusions
+
+
+class KeywordScorer:
+    """Scores fetched tweets for auto-liking.
+
+    A tweet scores the summed weight of the distinct keywords it contains
+    (repeats add a little), scaled by author signals: follower count,
+    verification and whether the author is a trusted source. Tweets that
+    contain any exclusion, or no keyword at all, are dropped. Hashtag-stuffed
+    tweets are penalised.
+    """
+
+    def __init__(self, keywords, exclusions=(), weights=None, trusted_ids=()):
+        weights = weights or {}
+        self.keywords = list(keywords)
+        self.weights = [float(weights.get(k, 1.0)) for k in self.keywords]
+        self.trusted_ids = set(str(i) for i in trusted_ids)
+        self._matcher = AhoCorasick(self.keywords + list(exclusions))
+
+    def search_terms(self):
+        """Keywords formatted for a search query (phrases quoted)"""
+        return [f'"{k}"' if ' ' in k else k for k in self.keywords]
+
+    def score(self, text, author=None):
+        """Return the score for text, or None if it should not be liked"""
+        hits = {}
+        for _, index in self._matcher.find(text):
+            if index >= len(self.keywords):
+                return None
+            hits[index] = hits.get(index, 0) + 1
+        if not hits:
+            return None
+        score = sum(self.weights[i] * (1 + 0.25 * math.log2(count)) for i, count in hits.items())
+        hashtags = text.count('#')
+        if hashtags > 3:
+            score -= 0.5 * (hashtags - 3)
+        if author is not None:
+            metrics = author.get('public_metrics') or {}
+            score *= 1 + 0.1 * math.log10(1 + metrics.get('followers_count', 0))
+            if author.get('verified'):
+                score += 0.5
+            if str(author.get('id')) in self.trusted_ids:
+                score += 2
+        return score if score > 0 else None
+
+    def score_batch(self, tweets, authors=None):
+        """Return (score, tweet) for every tweet worth liking"""
+        authors = authors or {}
+        scored = []
+        for tweet in tweets:
+            score = self.score(tweet.text, authors.get(str(tweet.author_id)))
+            if score is not None:
+                scored.append((score, tweet))
+        return scored
+
+
+class CandidateQueue:
+    """Bounded best-first queue of tweets waiting to be acted on.
+
+    Holds at most `capacity` candidates sorted by score; when full, a new
+    candidate only gets in by evicting the weakest one. Candidates older
+    than max_age seconds are dropped instead of being acted on late.
+    """
+
+    def __init__(self, capacity=200, max_age=6 * 3600):
+        self.capacity = capacity
+        self.max_age = max_age
+        self._items = []  # ascending by (score, sequence)
+        self._ids = set()
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __bool__(self):
+        return bool(self._items)
+
+    def push(self, score, tweet):
+        """Add a candidate; returns False if it is already queued or too weak to get in"""
+        if tweet.id in self._ids:
+            return False
+        if len(self._items) >= self.capacity:
+            if score <= self._items[0][0]:
+                return False
+            _, _, _, evicted = self._items.pop(0)
+            self._ids.discard(evicted.id)
+        bisect.insort(self._items, (score, next(self._counter), time.time(), tweet))
+        self._ids.add(tweet.id)
+        return True
+
+    def pop(self):
+        """Return (score, tweet) for the best fresh candidate, or None"""
+        cutoff = time.time() - self.max_age
+        while self._items:
+            score, _, added, tweet = self._items.pop()
+            self._ids.discard(tweet.id)
+            if added >= cutoff:
+                return score, tweet
+        return None
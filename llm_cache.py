@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+"""
+
+
+def make_key(model, system_prompt, prompt, temperature, max_tokens):
+    """Content-address an LLM request"""
+    payload = json.dumps([model, system_prompt, prompt, temperature, max_tokens], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """Two-tier cache for LLM responses: an in-memory LRU over a SQLite file.
+
+    Entries expire after ttl seconds in both tiers. The disk tier is capped
+    at max_entries; when it grows past the cap the least recently used tenth
+    is evicted in one statement. Concurrent lookups of the same key while a
+    request is in flight wait for that request instead of issuing another.
+    """
+
+    def __init__(self, path='llm_cache.db', memory_size=256, ttl=7 * 24 * 3600, max_entries=10000):
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._memory = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        # Several worker processes may share one cache file; wait for their writes instead of failing
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def _memory_get(self, key, now):
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        created, value = entry
+        if now - created > self.ttl:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_put(self, key, value, created):
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key, now):
+        with self._db_lock:
+            row = self.conn.execute(
+                "SELECT value, created FROM responses WHERE key = ? AND created > ?",
+                (key, now - self.ttl)
+            ).fetchone()
+            if row:
+                self.conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                self.conn.commit()
+        return row
+
+    def _disk_put(self, key, value, now):
+        with self._db_lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            count = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                self.conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                    (count - self.max_entries + self.max_entries // 10,)
+                )
+            self.conn.commit()
+
+    def get(self, key):
+        """Return a cached value, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            value = self._memory_get(key, now)
+        if value is None:
+            row = self._disk_get(key, now)
+            if row:
+                value = row[0]
+                with self._lock:
+                    self._memory_put(key, value, row[1])
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._memory_put(key, value, now)
+        self._disk_put(key, value, now)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, calling compute() at most once across threads on a miss"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+        try:
+            value = compute()
+            self.put(key, value)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def purge_expired(self):
+        """Delete expired entries from disk and return how many were removed"""
+        with self._db_lock:
+            removed = self.conn.execute(
+                "DELETE FROM responses WHERE created <= ?", (time.time() - self.ttl,)
+            ).rowcount
+            self.conn.commit()
+        logging.info(f"Purged {removed} expired LLM cache entries")
+        return removed
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_rate': self.hits / total if total else 0.0,
+                'memory_entries': len(self._memory),
+            }
+
+    def close(self):
+        with self._db_lock:
+            self.conn.close()
@@ -1,37 +1,160 @@
 import openai
 import os
-from dotenv import load_dotenv
 import logging
+import asyncio
+import queue
+import random
+import threading
+import time
+from collections import namedtuple
+from llm_cache import LLMCache, make_key
+from metrics import METRICS, record_llm_usage, register_cache_gauges
+from http_pool import HttpPoolConfig, make_http_client, make_async_http_client
+from structured_log import log_event
+from tweet_length import MAX_TWEET_LENGTH, TweetLengthCounter, truncate_tweet
+
+BatchResult = namedtuple('BatchResult', ['index', 'prompt', 'tweet', 'error'])
+
+TWEET_MODEL = "gpt-4o-mini"
+TWEET_MAX_TOKENS = 100
+SUMMARY_MODEL = "gpt-4o-mini"
 
 class LLMHandler:
-    def __init__(self):
-        load_dotenv()
+    def __init__(self, cache=None, client=None, http_config=None, traffic=None):
+        # Expects the environment to be loaded already (TwitterBot calls load_dotenv once)
         self.api_key = os.getenv('OPENAI_API_KEY')
         self.secret_word = os.getenv('LLM_SECRET_WORD')
         self.system_prompt = """You are a helpful Twitter bot assistant. You provide concise, 
         engaging responses that fit within Twitter's character limit. If a user's message doesn't 
         include the secret verification word, respond with a generic message about Twitter."""
         
-        if not self.api_key:
+        if client is None and not self.api_key:
             raise ValueError("OpenAI API key not found in environment variables")
         if not self.secret_word:
             raise ValueError("Secret word not found in environment variables")
             
-        openai.api_key = self.api_key
+        self.http_config = http_config or HttpPoolConfig()
+        # Optional traffic.TrafficRecorder / TrafficReplayer wrapped around the HTTP transports
+        self.traffic = traffic
+        # One pooled client for every call; pass client= to inject your own
+        self.client = client or openai.OpenAI(
+            api_key=self.api_key,
+            http_client=make_http_client(self.http_config, traffic),
+            max_retries=self.http_config.retries
+        )
+        self.cache = cache if cache is not None else LLMCache()
+        if self.cache is not None:
+            register_cache_gauges(self.cache)
         
     def _verify_secret_word(self, message):
         """Check if the message contains the secret word."""
         return self.secret_word.lower() in message.lower()
     
     def _format_for_twitter(self, text):
-        """Ensure the response fits Twitter's character limit."""
-        max_length = 280
-        if len(text) <= max_length:
-            return text
-        return text[:max_length-3] + "..."
+        """Ensure the response fits Twitter's character limit (weighted the way X counts it)."""
+        return truncate_tweet(text, MAX_TWEET_LENGTH)
     
-    def get_response(self, message, temperature=0.7):
-        """Get a response from the LLM."""
+    def _complete(self, model, prompt, temperature, max_tokens, use_cache=True):
+        """Run a chat completion, served from the response cache when possible"""
+        def request():
+            with METRICS.track('openai', model):
+                response = self.client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": self.system_prompt},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+            record_llm_usage(model, response.usage)
+            return response.choices[0].message.content
+
+        if not use_cache or self.cache is None:
+            return request()
+        key = make_key(model, self.system_prompt, prompt, temperature, max_tokens)
+        return self.cache.get_or_compute(key, request)
+
+    def _stream(self, model, prompt, temperature, max_tokens, on_token, use_cache=True):
+        """Stream a completion to on_token, stopping as soon as it would pass the tweet limit
+
+        Text is passed to on_token a word at a time, once the weighted length
+        including it is known to fit; the request is closed at the first word
+        that does not, so no tokens are paid for past the limit. A cached
+        response is passed to on_token whole. Returns the text sent.
+        """
+        sent = []
+
+        def request():
+            counter = TweetLengthCounter(MAX_TWEET_LENGTH)
+            raw = []
+            start = time.perf_counter()
+            first_token = None
+            with METRICS.track('openai', model):
+                stream = self.client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": self.system_prompt},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True,
+                    stream_options={"include_usage": True}
+                )
+                try:
+                    for chunk in stream:
+                        # Only the last chunk has usage, so a cut-off stream is not counted
+                        record_llm_usage(model, chunk.usage)
+                        delta = chunk.choices[0].delta.content if chunk.choices else None
+                        if not delta:
+                            continue
+                        if first_token is None:
+                            first_token = time.perf_counter() - start
+                            METRICS.observe('llm_time_to_first_token_seconds', first_token,
+                                            help="Seconds from request to first streamed token", model=model)
+                        raw.append(delta)
+                        text = counter.feed(delta)
+                        if text:
+                            sent.append(text)
+                            on_token(text)
+                        if counter.exceeded:
+                            break
+                finally:
+                    stream.close()
+            text = counter.finish()
+            if text:
+                sent.append(text)
+                on_token(text)
+            if counter.exceeded:
+                METRICS.inc('llm_stream_cutoffs_total', help="Streamed completions stopped at the tweet length limit",
+                            model=model)
+                log_event('llm_stream', 'cutoff', None, f"openai.{model}", time.perf_counter() - start,
+                          "Stopped at weighted length %d", counter.length)
+            # A first word longer than the whole limit leaves nothing; cut it by character instead
+            return counter.result() or truncate_tweet(''.join(raw).strip(), MAX_TWEET_LENGTH)
+
+        if not use_cache or self.cache is None:
+            content = request()
+        else:
+            key = make_key(model, self.system_prompt, prompt, temperature, max_tokens)
+            content = self._format_for_twitter(self.cache.get_or_compute(key, request))
+        # Cache hits, and requests that sent nothing, are delivered in one piece
+        rest = content[len(''.join(sent).strip()):]
+        if rest:
+            on_token(rest)
+        return content
+
+    def complete(self, prompt, max_tokens=300, model=SUMMARY_MODEL, temperature=0.3, use_cache=True, for_twitter=False):
+        """Run a prompt built by the bot itself (e.g. summaries); no secret word is needed"""
+        content = self._complete(model, prompt, temperature, max_tokens, use_cache=use_cache)
+        return self._format_for_twitter(content) if for_twitter else content
+
+    def get_response(self, message, temperature=0.7, use_cache=True, on_token=None):
+        """Get a response from the LLM.
+
+        With on_token, the response is streamed to it as it is generated (see _stream).
+        """
         try:
             if not self._verify_secret_word(message):
                 logging.warning("Unauthorized LLM access attempt")
@@ -40,24 +163,28 @@ class LLMHandler:
             # Remove the secret word from the message before sending to API
             cleaned_message = message.replace(self.secret_word, "").strip()
             
-            response = openai.chat.completions.create(
-                model="gpt-4",  # You can change this to other models
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": cleaned_message}
-                ],
-                temperature=temperature,
-                max_tokens=150  # Adjust based on your needs
+            if on_token is not None:
+                return self._stream("gpt-4", cleaned_message, temperature, 150, on_token, use_cache=use_cache)
+
+            content = self._complete(
+                "gpt-4",  # You can change this to other models
+                cleaned_message,
+                temperature,
+                150,  # Adjust based on your needs
+                use_cache=use_cache
             )
             
-            return self._format_for_twitter(response.choices[0].message.content)
+            return self._format_for_twitter(content)
             
         except Exception as e:
             logging.error(f"Error in LLM processing: {e}")
             return f"Sorry, I encountered an error: {str(e)}"
     
-    def generate_tweet(self, prompt, temperature=0.7):
-        """Generate a tweet from a prompt."""
+    def _tweet_prompt(self, cleaned_prompt):
+        return f"Generate a Twitter post based on this prompt: {cleaned_prompt}, only reply with the tweet and hashtags, nothing else"
+
+    def generate_tweet(self, prompt, temperature=0.7, use_cache=True, on_token=None):
+        """Generate a tweet from a prompt, streamed to on_token if given."""
         try:
             if not self._verify_secret_word(prompt):
                 logging.warning("Unauthorized tweet generation attempt")
@@ -66,20 +193,156 @@ class LLMHandler:
             # Remove the secret word from the prompt
             cleaned_prompt = prompt.replace(self.secret_word, "").strip()
             
-            specific_prompt = f"Generate a Twitter post based on this prompt: {cleaned_prompt}, only reply with the tweet and hashtags, nothing else"
+            specific_prompt = self._tweet_prompt(cleaned_prompt)
+
+            if on_token is not None:
+                return self._stream(TWEET_MODEL, specific_prompt, temperature, TWEET_MAX_TOKENS, on_token,
+                                    use_cache=use_cache)
             
-            response = openai.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": specific_prompt}
-                ],
-                temperature=temperature,
-                max_tokens=100
-            )
+            content = self._complete(TWEET_MODEL, specific_prompt, temperature, TWEET_MAX_TOKENS, use_cache=use_cache)
             
-            return self._format_for_twitter(response.choices[0].message.content)
+            return self._format_for_twitter(content)
             
         except Exception as e:
             logging.error(f"Error in tweet generation: {e}")
-            return f"Sorry, I encountered an error: {str(e)}"
\ No newline at end of file
+            return f"Sorry, I encountered an error: {str(e)}"
+
+    @staticmethod
+    def _retry_delay(error, attempt):
+        """Return how long to wait before retrying error, or None if it should not be retried"""
+        if isinstance(error, openai.RateLimitError):
+            retry_after = error.response.headers.get('retry-after')
+            if retry_after:
+                try:
+                    return float(retry_after)
+                except ValueError:
+                    pass
+        elif isinstance(error, openai.APIStatusError):
+            if error.status_code < 500:
+                return None
+        elif not isinstance(error, openai.APIConnectionError):
+            return None
+        return min(60, 2 ** attempt) + random.uniform(0, 1)
+
+    async def _agenerate_tweet(self, client, prompt, temperature, max_retries):
+        """Generate one tweet with the async client, retrying 429/5xx with backoff"""
+        if not self._verify_secret_word(prompt):
+            raise PermissionError("Tweet generation requires proper authorization.")
+        specific_prompt = self._tweet_prompt(prompt.replace(self.secret_word, "").strip())
+        key = make_key(TWEET_MODEL, self.system_prompt, specific_prompt, temperature, TWEET_MAX_TOKENS)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return self._format_for_twitter(cached)
+
+        attempt = 0
+        while True:
+            try:
+                with METRICS.track('openai', TWEET_MODEL):
+                    response = await client.chat.completions.create(
+                        model=TWEET_MODEL,
+                        messages=[
+                            {"role": "system", "content": self.system_prompt},
+                            {"role": "user", "content": specific_prompt}
+                        ],
+                        temperature=temperature,
+                        max_tokens=TWEET_MAX_TOKENS
+                    )
+                break
+            except openai.OpenAIError as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None or attempt >= max_retries:
+                    raise
+                attempt += 1
+                logging.warning("Retrying tweet generation in %.1fs after error: %s", delay, e)
+                await asyncio.sleep(delay)
+
+        record_llm_usage(TWEET_MODEL, response.usage)
+        content = response.choices[0].message.content
+        if self.cache is not None:
+            self.cache.put(key, content)
+        return self._format_for_twitter(content)
+
+    def _batch_http_config(self, concurrency):
+        config = HttpPoolConfig(**vars(self.http_config))
+        config.max_connections = max(config.max_connections, concurrency)
+        config.max_keepalive = max(config.max_keepalive, concurrency)
+        return config
+
+    async def _generate_batch_async(self, prompts, concurrency, temperature, max_retries, emit, stop):
+        # Async connections belong to this batch's event loop, so the async client lives per batch
+        client = openai.AsyncOpenAI(
+            api_key=self.client.api_key,
+            base_url=self.client.base_url,
+            http_client=make_async_http_client(self._batch_http_config(concurrency), self.traffic),
+            max_retries=0
+        )
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(index, prompt):
+            async with semaphore:
+                try:
+                    tweet = await self._agenerate_tweet(client, prompt, temperature, max_retries)
+                    return BatchResult(index, prompt, tweet, None)
+                except Exception as e:
+                    logging.error("Error in batch tweet generation for prompt %d: %s", index, e)
+                    return BatchResult(index, prompt, None, str(e))
+
+        tasks = [asyncio.ensure_future(run(i, p)) for i, p in enumerate(prompts)]
+
+        async def watch():
+            # stop is a threading.Event set from the consuming thread, so it is polled
+            while not stop.is_set():
+                await asyncio.sleep(0.2)
+            for task in tasks:
+                task.cancel()
+
+        watcher = asyncio.ensure_future(watch())
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    result = await next_done
+                except asyncio.CancelledError:
+                    logging.info("Batch tweet generation cancelled")
+                    break
+                emit(result)
+        finally:
+            watcher.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(watcher, *tasks, return_exceptions=True)
+            await client.close()
+
+    def generate_tweets_batch(self, prompts, concurrency=8, temperature=0.7, max_retries=5):
+        """Generate tweets for many prompts concurrently.
+
+        At most `concurrency` requests are in flight at once; 429 and 5xx
+        responses are retried with exponential backoff (honouring
+        Retry-After). BatchResult tuples are yielded in completion order,
+        not prompt order; failed prompts come back with `error` set.
+        Closing the generator early (or an exception such as Ctrl+C in the
+        consumer) cancels the requests still queued or in flight.
+        """
+        prompts = list(prompts)
+        results = queue.Queue()
+        done = object()
+        stop = threading.Event()
+
+        def worker():
+            try:
+                asyncio.run(self._generate_batch_async(prompts, concurrency, temperature, max_retries, results.put,
+                                                       stop))
+            except Exception as e:
+                logging.error(f"Batch tweet generation failed: {e}")
+            finally:
+                results.put(done)
+
+        threading.Thread(target=worker, name='llm-batch', daemon=True).start()
+        try:
+            while True:
+                result = results.get()
+                if result is done:
+                    return
+                yield result
+        finally:
+            stop.set()
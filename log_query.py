@@ -0,0 +1,215 @@
+"""Filter and aggregate the bot's JSON-lines logs, including rotated .gz backups.
+
+Files are streamed line by line, so any amount of history can be queried
+in constant memory. Examples:
+
+    python log_query.py --action like --since 24h
+    python log_query.py --outcome error --count-by endpoint
+    python log_query.py --action api_call --stats endpoint
+"""
+import argparse
+import glob
+import gzip
+import json
+import math
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+
+from structured_log import FIELDS
+
+DURATION_RE = re.compile(r'^(\d+(?:\.\d+)?)([smhd])$')
+UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+# Latency histogram buckets grow by 5%, so percentiles are within about 5%
+BUCKET_BASE = math.log(1.05)
+
+
+def parse_time(value):
+    """Accept a relative duration (30m, 24h, 7d), an ISO date/time or a unix timestamp"""
+    match = DURATION_RE.match(value)
+    if match:
+        return time.time() - float(match.group(1)) * UNITS[match.group(2)]
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    for fmt in ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M', '%Y-%m-%d'):
+        try:
+            return time.mktime(time.strptime(value, fmt))
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"Unrecognised time: {value}")
+
+
+def log_files(path):
+    """Return the log and its rotated backups, oldest first"""
+    def backup_number(name):
+        digits = name[len(path) + 1:].split('.')[0]
+        return int(digits) if digits.isdigit() else 0
+
+    backups = sorted(glob.glob(f"{glob.escape(path)}.*"), key=backup_number, reverse=True)
+    files = [f for f in backups if backup_number(f)]
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def open_log(filename):
+    if filename.endswith('.gz'):
+        return gzip.open(filename, 'rt', encoding='utf-8', errors='replace')
+    return open(filename, encoding='utf-8', errors='replace')
+
+
+class Query:
+    """Field filters plus a cheap substring pre-check so most lines are never JSON-decoded"""
+
+    def __init__(self, filters=None, since=None, until=None, text=None):
+        self.filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        self.since = since
+        self.until = until
+        self.text = text
+        # The writer uses compact separators, so an exact field match always contains this text
+        self._needles = [f'"{k}":{json.dumps(v)}' for k, v in self.filters.items()]
+
+    def prefilter(self, line):
+        if self.text and self.text not in line:
+            return False
+        return all(needle in line for needle in self._needles)
+
+    def matches(self, event):
+        if self.since is not None and event.get('ts', 0) < self.since:
+            return False
+        if self.until is not None and event.get('ts', 0) >= self.until:
+            return False
+        return all(event.get(k) == v for k, v in self.filters.items())
+
+    def run(self, files):
+        for filename in files:
+            if self.since is not None and os.path.getmtime(filename) < self.since:
+                continue
+            with open_log(filename) as f:
+                for line in f:
+                    if not line.startswith('{') or not self.prefilter(line):
+                        continue
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue
+                    if self.matches(event):
+                        yield event
+
+
+class LatencyStats:
+    """Count, errors and approximate latency percentiles for one group, in constant memory"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.timed = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = defaultdict(int)
+
+    def add(self, event):
+        self.count += 1
+        if event.get('outcome') not in (None, 'ok'):
+            self.errors += 1
+        latency = event.get('latency')
+        if latency is not None:
+            self.timed += 1
+            self.total += latency
+            self.max = max(self.max, latency)
+            self.buckets[math.floor(math.log(max(latency, 1e-6)) / BUCKET_BASE)] += 1
+
+    def percentile(self, q):
+        if not self.timed:
+            return None
+        rank = q * self.timed
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(math.exp((bucket + 1) * BUCKET_BASE), self.max)
+        return self.max
+
+
+def format_event(event):
+    stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(event.get('ts', 0)))
+    parts = [stamp, event.get('level') or '-']
+    for field in ('action', 'outcome', 'endpoint', 'tweet_id'):
+        if event.get(field) is not None:
+            parts.append(f"{field}={event[field]}")
+    if event.get('latency') is not None:
+        parts.append(f"latency={event['latency'] * 1000:.1f}ms")
+    if event.get('message'):
+        parts.append(event['message'])
+    return ' '.join(parts)
+
+
+def ms(value):
+    return f"{value * 1000:.1f}" if value is not None else '-'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Query the bot's structured logs")
+    parser.add_argument('--log', default=os.getenv('LOG_FILE', 'bot.log'), help="Log file (rotated .gz backups are included)")
+    parser.add_argument('--action', help="e.g. post, like, retweet, api_call")
+    parser.add_argument('--outcome', help="e.g. ok, error, duplicate, rate_limited")
+    parser.add_argument('--endpoint', help="e.g. x.like, openai.gpt-4o-mini")
+    parser.add_argument('--tweet-id')
+    parser.add_argument('--level', type=str.upper)
+    parser.add_argument('--since', type=parse_time, help="Start time: 30m, 24h, 7d, 2024-05-01 or a timestamp")
+    parser.add_argument('--until', type=parse_time, help="End time, same formats as --since")
+    parser.add_argument('--grep', help="Only entries whose line contains this text")
+    parser.add_argument('--count-by', choices=FIELDS, help="Print entry counts per value of a field")
+    parser.add_argument('--stats', choices=FIELDS, metavar='FIELD',
+                        help="Print count, errors and latency percentiles per value of a field")
+    parser.add_argument('--json', action='store_true', help="Print matching entries as JSON lines")
+    parser.add_argument('--limit', type=int, help="Stop after this many matching entries")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    files = log_files(args.log)
+    if not files:
+        print(f"No log files found at {args.log}", file=sys.stderr)
+        return 1
+
+    query = Query(
+        {'action': args.action, 'outcome': args.outcome, 'endpoint': args.endpoint,
+         'tweet_id': args.tweet_id, 'level': args.level},
+        since=args.since, until=args.until, text=args.grep
+    )
+    events = query.run(files)
+
+    if args.count_by:
+        counts = defaultdict(int)
+        for event in events:
+            counts[event.get(args.count_by)] += 1
+        for value, count in sorted(counts.items(), key=lambda item: -item[1]):
+            print(f"{count:>10}  {value}")
+    elif args.stats:
+        groups = defaultdict(LatencyStats)
+        for event in events:
+            groups[event.get(args.stats)].add(event)
+        print(f"{args.stats:<32} {'count':>8} {'errors':>7} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for value, stats in sorted(groups.items(), key=lambda item: -item[1].count):
+            mean = stats.total / stats.timed if stats.timed else None
+            print(f"{str(value):<32} {stats.count:>8} {stats.errors:>7} {ms(mean):>9} "
+                  f"{ms(stats.percentile(0.5)):>9} {ms(stats.percentile(0.95)):>9} {ms(stats.percentile(0.99)):>9}")
+    else:
+        try:
+            for count, event in enumerate(events, 1):
+                print(json.dumps(event) if args.json else format_event(event))
+                if args.limit and count >= args.limit:
+                    break
+        except BrokenPipeError:
+            sys.stderr.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
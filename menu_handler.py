@@ -1,4 +1,5 @@
 import logging
+from csv_loader import TweetCsvWriter
 
 class MenuHandler:
     def __init__(self, bot):
@@ -14,9 +15,26 @@ class MenuHandler:
             
             elif choice == '2':
                 csv_filename = 'tweets.csv'
-                tweets = self.bot.load_tweets_from_csv(csv_filename)
-                if tweets:
-                    self.bot.schedule_tweets(tweets)
+                start_row = self.bot.outbox.progress(csv_filename)
+                if start_row and input(f"Rows 1-{start_row} were already queued. Skip them? (y/n): ").lower() != 'y':
+                    start_row = 0
+                rows = self.bot.iter_tweets_from_csv(csv_filename, start_row)
+                if input("Check for near-duplicate tweets first? (y/n): ").lower() == 'y':
+                    duplicates = self.bot.precheck_csv(csv_filename, start_row)
+                    if duplicates and input("Skip these rows? (y/n): ").lower() == 'y':
+                        skip = {row.row_number for row, _ in duplicates}
+                        rows = (row for row in rows if row.row_number not in skip)
+                hours = input("Hours between tweets (default 2): ").strip()
+                window = input("Posting window, e.g. 'mon-fri 09:00-17:00' (blank for any time): ").strip()
+                try:
+                    self.bot.schedule_tweets(
+                        rows,
+                        interval_hours=float(hours) if hours else 2,
+                        window=window or None,
+                        source=csv_filename
+                    )
+                except ValueError as e:
+                    print(f"Invalid schedule settings: {e}")
             
             elif choice == '3':
                 self.handle_llm_interface()
@@ -48,25 +66,83 @@ class MenuHandler:
             print("\n=== LLM Interface ===")
             print("1. Get LLM response")
             print("2. Generate tweet")
-            print("3. Return to main menu")
+            print("3. Generate tweets in bulk to CSV")
+            print("4. Return to main menu")
             
-            choice = input("Enter your choice (1-3): ")
+            choice = input("Enter your choice (1-4): ")
             
             if choice == "1":
                 prompt = input("Enter your message (include secret word): ")
-                response = self.bot.llm.get_response(prompt)
-                print(f"\nLLM Response: {response}")
+                print("\nLLM Response: ", end='', flush=True)
+                response = self._stream(self.bot.llm.get_response, prompt)
                 
                 if input("\nWould you like to tweet this response? (y/n): ").lower() == 'y':
                     self.bot.send_manual_tweet(response)
             
             elif choice == "2":
                 prompt = input("Enter tweet generation prompt (include secret word): ")
-                tweet = self.bot.llm.generate_tweet(prompt)
-                print(f"\nGenerated Tweet: {tweet}")
+                use_cache = True
+                while True:
+                    print("\nGenerated Tweet: ", end='', flush=True)
+                    tweet = self._stream(self.bot.llm.generate_tweet, prompt, use_cache=use_cache)
+                    answer = input("\nWould you like to post this tweet? (y/n, r to regenerate): ").lower()
+                    if answer != 'r':
+                        break
+                    use_cache = False
                 
-                if input("\nWould you like to post this tweet? (y/n): ").lower() == 'y':
+                if answer == 'y':
                     self.bot.send_manual_tweet(tweet)
             
             elif choice == "3":
-                break
\ No newline at end of file
+                self.handle_batch_generation()
+            
+            elif choice == "4":
+                break
+
+    def _stream(self, generate, prompt, **kwargs):
+        """Run an LLMHandler call in streaming mode, printing the text as it arrives"""
+        printed = []
+
+        def show(text):
+            printed.append(text)
+            print(text, end='', flush=True)
+
+        result = generate(prompt, on_token=show, **kwargs)
+        if ''.join(printed).strip() != result:
+            # Refusals and errors come back without being streamed
+            print(f"\n{result}" if printed else result, end='')
+        print()
+        return result
+
+    def handle_batch_generation(self):
+        """Generate tweets for every prompt in a file and append them to a CSV"""
+        prompts_file = input("Enter prompts file (one prompt per line): ").strip()
+        secret = input("Enter secret word: ")
+        csv_filename = input("Output CSV (default tweets.csv): ").strip() or 'tweets.csv'
+        concurrency = input("Requests in flight (default 8): ").strip()
+        try:
+            concurrency = int(concurrency) if concurrency else 8
+            if concurrency < 1:
+                raise ValueError(concurrency)
+        except ValueError:
+            print("Invalid number of requests in flight: enter a whole number of at least 1.")
+            return
+        try:
+            with open(prompts_file, 'r', encoding='utf-8') as f:
+                prompts = [f"{secret} {line.strip()}" for line in f if line.strip()]
+        except FileNotFoundError:
+            print(f"Error: prompts file {prompts_file} not found.")
+            return
+
+        written = failed = 0
+        with TweetCsvWriter(csv_filename) as writer:
+            for result in self.bot.llm.generate_tweets_batch(prompts, concurrency=concurrency):
+                if result.error:
+                    failed += 1
+                    print(f"[{written + failed}/{len(prompts)}] Prompt {result.index + 1} failed: {result.error}")
+                else:
+                    writer.write(result.tweet)
+                    written += 1
+                    print(f"[{written + failed}/{len(prompts)}] {result.tweet}")
+        print(f"\nWrote {written} tweets to {csv_filename} ({failed} failed).")
+        logging.info(f"Batch generated {written} tweets into {csv_filename}, {failed} failed")
\ No newline at end of file
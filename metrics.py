@@ -0,0 +1,271 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from structured_log import log_event
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{k}="{str(v)}"'.replace('\n', ' ') for k, v in labels)
+    return f'{{{pairs}}}'
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """Thread-safe counters, histograms and callback gauges with Prometheus text export"""
+
+    def __init__(self, prefix='bot'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._help = {}
+        self._const_labels = ()
+
+    def set_labels(self, **labels):
+        """Add labels to every exported series (e.g. worker="2" when several processes export)"""
+        self._const_labels = tuple(sorted(labels.items()))
+
+    def _key(self, name, labels):
+        return f"{self.prefix}_{name}", tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, help=None, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            if help:
+                self._help[key[0]] = help
+
+    def observe(self, name, value, help=None, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+            if help:
+                self._help[key[0]] = help
+
+    def gauge(self, name, func, help=None, **labels):
+        """Register a gauge whose value is read from func() at export time"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = func
+            if help:
+                self._help[key[0]] = help
+
+    def counter_value(self, name, **labels):
+        with self._lock:
+            return self._counters.get(self._key(name, labels), 0)
+
+    def histogram(self, name, **labels):
+        with self._lock:
+            return self._histograms.get(self._key(name, labels))
+
+    @contextmanager
+    def track(self, client, endpoint, **labels):
+        """Time a call and count its errors and rate-limit responses"""
+        start = time.perf_counter()
+        outcome = 'ok'
+        try:
+            yield
+        except Exception as e:
+            status = getattr(e, 'status_code', None) or getattr(getattr(e, 'response', None), 'status_code', None)
+            outcome = 'rate_limited' if status == 429 else 'error'
+            self.inc('api_errors_total', help="API calls that raised, by error type",
+                     client=client, endpoint=endpoint, error=type(e).__name__, **labels)
+            if status == 429:
+                self.inc('api_rate_limited_total', help="API calls rejected with HTTP 429",
+                         client=client, endpoint=endpoint, **labels)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe('api_request_duration_seconds', elapsed,
+                         help="Wall time of API calls in seconds", client=client, endpoint=endpoint, **labels)
+            log_event('api_call', outcome, None, f"{client}.{endpoint}", elapsed)
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: (h.buckets, list(h.counts), h.total, h.sum) for k, h in self._histograms.items()}
+            gauges = dict(self._gauges)
+            help_text = dict(self._help)
+        const = self._const_labels
+
+        seen = set()
+
+        def header(name, kind):
+            if name in seen:
+                return
+            seen.add(name)
+            if name in help_text:
+                lines.append(f"# HELP {name} {help_text[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, 'counter')
+            lines.append(f"{name}{_label_text(const + labels)} {value}")
+        for (name, labels), func in sorted(gauges.items(), key=lambda item: item[0]):
+            try:
+                value = func()
+            except Exception as e:
+                logging.warning("Gauge %s failed: %s", name, e)
+                continue
+            header(name, 'gauge')
+            lines.append(f"{name}{_label_text(const + labels)} {value}")
+        for (name, labels), (buckets, counts, total, total_sum) in sorted(histograms.items()):
+            labels = const + labels
+            header(name, 'histogram')
+            for bound, count in zip(buckets, counts):
+                lines.append(f"{name}_bucket{_label_text(labels + (('le', bound),))} {count}")
+            lines.append(f"{name}_bucket{_label_text(labels + (('le', '+Inf'),))} {total}")
+            lines.append(f"{name}_sum{_label_text(labels)} {total_sum}")
+            lines.append(f"{name}_count{_label_text(labels)} {total}")
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """Atomically write the metrics to path (node_exporter textfile style)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def start_textfile_writer(self, path, interval=15, stop_event=None):
+        """Rewrite path every interval seconds on a background thread"""
+        stop_event = stop_event or threading.Event()
+
+        def run():
+            while True:
+                try:
+                    self.write_textfile(path)
+                except OSError as e:
+                    logging.error("Could not write metrics to %s: %s", path, e)
+                if stop_event.wait(interval):
+                    self.write_textfile(path)
+                    return
+
+        threading.Thread(target=run, name='metrics-textfile', daemon=True).start()
+        return stop_event
+
+    def start_http_server(self, port, host='127.0.0.1'):
+        """Serve GET /metrics on a background thread and return the server"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                data = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+        logging.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+
+METRICS = MetricsRegistry()
+
+
+class InstrumentedClient:
+    """Wraps a tweepy.Client so every API method call is timed and counted in METRICS
+
+    Extra labels (e.g. account="brand_a") are added to every series it records.
+    """
+
+    def __init__(self, client, registry=None, **labels):
+        self._client = client
+        self._registry = registry or METRICS
+        self._labels = labels
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+        registry = self._registry
+        labels = self._labels
+
+        def call(*args, **kwargs):
+            with registry.track('x', name, **labels):
+                return attr(*args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+
+def record_llm_usage(model, usage, registry=None):
+    """Count prompt and completion tokens from an OpenAI usage object"""
+    if usage is None:
+        return
+    registry = registry or METRICS
+    for kind in ('prompt', 'completion'):
+        tokens = getattr(usage, f'{kind}_tokens', None)
+        if tokens:
+            registry.inc('llm_tokens_total', tokens, help="LLM tokens used", model=model, kind=kind)
+
+
+def register_cache_gauges(cache, registry=None):
+    """Expose LLMCache hit/miss counts and hit ratio"""
+    registry = registry or METRICS
+    registry.gauge('llm_cache_hits', lambda: cache.stats()['hits'], help="LLM cache hits")
+    registry.gauge('llm_cache_misses', lambda: cache.stats()['misses'], help="LLM cache misses")
+    registry.gauge('llm_cache_hit_ratio', lambda: cache.stats()['hit_rate'], help="LLM cache hit ratio")
+
+
+@contextmanager
+def profiled(name, profile_dir=None):
+    """Run the block under cProfile when profile_dir (or $BOT_PROFILE_DIR) is set
+
+    Stats are dumped to <profile_dir>/<name>-<pid>-<timestamp>.prof, readable
+    with `python -m pstats` or snakeviz.
+    """
+    profile_dir = profile_dir or os.getenv('BOT_PROFILE_DIR')
+    if not profile_dir:
+        yield
+        return
+    import cProfile
+    os.makedirs(profile_dir, exist_ok=True)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        path = os.path.join(profile_dir, f"{name}-{os.getpid()}-{int(time.time())}.prof")
+        profiler.dump_stats(path)
+        logging.info(f"Wrote profile for {name} to {path}")
@@ -0,0 +1,326 @@
+import json
+import logging
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from http_pool import PooledAdapter
+from rate_limiter import endpoint_for
+
+X_API_HOSTS = ['https://api.twitter.com', 'https://api.x.com']
+
+
+class RedirectAdapter(PooledAdapter):
+    """Transport adapter that sends X API requests to another base URL"""
+
+    def __init__(self, base_url, config=None, **kwargs):
+        super().__init__(config, **kwargs)
+        self.base_url = base_url.rstrip('/')
+
+    def send(self, request, **kwargs):
+        parsed = urlparse(request.url)
+        request.url = f"{self.base_url}{parsed.path}" + (f"?{parsed.query}" if parsed.query else '')
+        return super().send(request, **kwargs)
+
+
+def redirect_client(client, base_url, config=None):
+    """Point a tweepy.Client at base_url (e.g. a MockApiServer) instead of the real API"""
+    adapter = RedirectAdapter(base_url, config)
+    for host in X_API_HOSTS:
+        client.session.mount(host, adapter)
+    logging.info(f"X API requests redirected to {base_url}")
+
+
+class EventStream:
+    """Chunks of a streamed chat completion, sent delay seconds apart"""
+
+    def __init__(self, chunks, delay=0.0):
+        self.chunks = chunks
+        self.delay = delay
+
+    def lines(self):
+        for i, chunk in enumerate(self.chunks):
+            if i and self.delay:
+                time.sleep(self.delay)
+            yield f"data: {json.dumps(chunk)}\n\n".encode('utf-8')
+        yield b"data: [DONE]\n\n"
+
+
+class MockApiServer:
+    """Local stand-in for the X v2 endpoints the bot uses and OpenAI chat completions.
+
+    Runs a threaded HTTP server on localhost. Every response waits `latency`
+    seconds (plus up to `latency_jitter`), a fraction `error_rate` of
+    requests fail with a 503, and each endpoint enforces a fixed-window
+    rate limit reported through the usual x-rate-limit-* headers. Search
+    results are synthetic tweets with ever-increasing ids, so since_id and
+    pagination behave like the real API. Chat completions requested with
+    stream=true are sent as server-sent events, one word every
+    token_latency seconds; reply_words pads replies to that many words.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, latency_jitter=0.0,
+                 error_rate=0.0, rate_limit=100000, rate_window=900, seed=None,
+                 token_latency=0.0, reply_words=None):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.reply_words = reply_words
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.windows = {}
+        self.request_counts = {}
+        self.next_tweet_id = 1000
+        self.posted = {}
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='mock-api', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _take_budget(self, endpoint):
+        """Count a request against endpoint's window; returns (allowed, remaining, reset_at)"""
+        now = time.time()
+        with self.lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+            used, reset_at = self.windows.get(endpoint, (0, now + self.rate_window))
+            if now >= reset_at:
+                used, reset_at = 0, now + self.rate_window
+            allowed = used < self.rate_limit
+            if allowed:
+                used += 1
+            self.windows[endpoint] = (used, reset_at)
+            return allowed, self.rate_limit - used, int(reset_at)
+
+    def _new_tweets(self, count):
+        with self.lock:
+            first = self.next_tweet_id
+            self.next_tweet_id += count
+        return list(range(first + count - 1, first - 1, -1))
+
+    def _search(self, params):
+        max_results = int(params.get('max_results', ['10'])[0])
+        since_id = int(params.get('since_id', ['0'])[0])
+        page = int(params.get('next_token', ['0'])[0])
+        ids = [i for i in self._new_tweets(max_results) if i > since_id]
+        if not ids:
+            return {'meta': {'result_count': 0}}
+        meta = {'newest_id': str(ids[0]), 'oldest_id': str(ids[-1]), 'result_count': len(ids)}
+        if page < 2:
+            meta['next_token'] = str(page + 1)
+        created = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
+        data = [{'id': str(i), 'text': f"Mock tweet {i} about {params.get('query', [''])[0][:40]}",
+                 'author_id': str(100 + i % 50), 'created_at': created,
+                 'edit_history_tweet_ids': [str(i)]} for i in ids]
+        response = {'data': data, 'meta': meta}
+        if 'author_id' in params.get('expansions', [''])[0]:
+            authors = sorted({tweet['author_id'] for tweet in data})
+            response['includes'] = {'users': [
+                {'id': a, 'name': f"user{a}", 'username': f"user{a}", 'verified': int(a) % 7 == 0,
+                 'public_metrics': {'followers_count': int(a) ** 2, 'following_count': 10,
+                                    'tweet_count': 100, 'listed_count': 1}}
+                for a in authors
+            ]}
+        return response
+
+    def _users_by(self, params):
+        usernames = params.get('usernames', [''])[0].split(',')
+        return {'data': [{'id': str(zlib.crc32(u.lower().encode())), 'name': u, 'username': u} for u in usernames if u]}
+
+    def _create_tweet(self, body):
+        text = body.get('text', '')
+        with self.lock:
+            if text in self.posted:
+                return 403, {'title': 'Forbidden', 'detail': 'You are not allowed to create a Tweet with duplicate content.'}
+            tweet_id = str(self.next_tweet_id)
+            self.next_tweet_id += 1
+            self.posted[text] = tweet_id
+        return 201, {'data': {'id': tweet_id, 'text': text}}
+
+    def _chat_completion(self, body):
+        prompt = body['messages'][-1]['content']
+        content = f"Mock reply to: {prompt[:120]} #mock"
+        if self.reply_words:
+            words = content.split()
+            content = ' '.join(words + [f"word{i}" for i in range(len(words), self.reply_words)])
+        prompt_tokens = sum(len(m['content'].split()) for m in body['messages'])
+        completion_tokens = len(content.split())
+        return 200, {
+            'id': f"chatcmpl-{self.random.randrange(10 ** 9)}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'mock'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens},
+        }
+
+    def _chat_stream(self, completion):
+        """Turn a chat completion into the chunks of a streamed one, one word per chunk"""
+        base = {'id': completion['id'], 'object': 'chat.completion.chunk',
+                'created': completion['created'], 'model': completion['model']}
+        content = completion['choices'][0]['message']['content']
+        words = content.split(' ')
+        chunks = [{**base, 'choices': [{'index': 0, 'delta': {'role': 'assistant', 'content': ''},
+                                        'finish_reason': None}]}]
+        for i, word in enumerate(words):
+            text = word if i == len(words) - 1 else word + ' '
+            chunks.append({**base, 'choices': [{'index': 0, 'delta': {'content': text}, 'finish_reason': None}]})
+        chunks.append({**base, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})
+        chunks.append({**base, 'choices': [], 'usage': completion['usage']})
+        return EventStream(chunks, self.token_latency)
+
+    def handle(self, method, url, body):
+        """Return (status, headers, payload) for a request"""
+        delay = self.latency + (self.random.uniform(0, self.latency_jitter) if self.latency_jitter else 0)
+        if delay:
+            time.sleep(delay)
+        path = urlparse(url).path
+        params = parse_qs(urlparse(url).query)
+        endpoint = 'chat' if path.endswith('/chat/completions') else endpoint_for(method, url)
+        if endpoint is None:
+            return 404, {}, {'title': 'Not Found Error', 'detail': f"No mock for {method} {path}"}
+
+        allowed, remaining, reset_at = self._take_budget(endpoint)
+        headers = {'x-rate-limit-limit': str(self.rate_limit),
+                   'x-rate-limit-remaining': str(max(0, remaining)),
+                   'x-rate-limit-reset': str(reset_at)}
+        if not allowed:
+            headers['retry-after'] = str(max(0, reset_at - int(time.time())))
+            return 429, headers, {'title': 'Too Many Requests', 'detail': 'Too Many Requests'}
+        if self.error_rate and self.random.random() < self.error_rate:
+            return 503, headers, {'title': 'Service Unavailable', 'detail': 'Injected error'}
+
+        if endpoint == 'get_me':
+            return 200, headers, {'data': {'id': '1', 'name': 'Mock Bot', 'username': 'mockbot'}}
+        if endpoint == 'search':
+            return 200, headers, self._search(params)
+        if endpoint == 'get_users':
+            return 200, headers, self._users_by(params)
+        if endpoint == 'like':
+            return 200, headers, {'data': {'liked': True}}
+        if endpoint == 'retweet':
+            return 200, headers, {'data': {'retweeted': True}}
+        if endpoint == 'create_tweet':
+            status, payload = self._create_tweet(body)
+            return status, headers, payload
+        status, payload = self._chat_completion(body)
+        if body.get('stream'):
+            return status, headers, self._chat_stream(payload)
+        return status, headers, payload
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Send headers and body in one segment; otherwise delayed ACKs add ~40ms per call
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def _respond(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    body = {}
+                status, headers, payload = server.handle(self.command, self.path, body)
+                if isinstance(payload, EventStream):
+                    self._send_events(status, headers, payload)
+                    return
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_events(self, status, headers, stream):
+                """Write server-sent events with chunked encoding, flushing each one"""
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                try:
+                    for data in stream.lines():
+                        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+                        self.wfile.flush()
+                    self.wfile.write(b"0\r\n\r\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            # A client may stop reading mid-stream (e.g. a reply cut off at the tweet length limit)
+            def handle(self):
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def finish(self):
+                try:
+                    super().finish()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            do_GET = _respond
+            do_POST = _respond
+            do_DELETE = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local mock of the X and OpenAI APIs")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds added to every response")
+    parser.add_argument('--latency-jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument('--rate-limit', type=int, default=100000, help="requests per endpoint per window")
+    parser.add_argument('--token-latency', type=float, default=0.0, help="seconds between streamed words")
+    parser.add_argument('--reply-words', type=int, help="pad chat replies to this many words")
+    args = parser.parse_args()
+    mock = MockApiServer(port=args.port, latency=args.latency, latency_jitter=args.latency_jitter,
+                         error_rate=args.error_rate, rate_limit=args.rate_limit,
+                         token_latency=args.token_latency, reply_words=args.reply_words)
+    print(f"Mock API listening on {mock.url}")
+    print(f"  X_API_BASE_URL={mock.url}  OPENAI_BASE_URL={mock.url}/v1")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        mock.stop()
@@ -0,0 +1,190 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idem_key TEXT NOT NULL UNIQUE,
+    text TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    due REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    tweet_id TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS posts_status_due ON posts (status, due);
+CREATE TABLE IF NOT EXISTS sources (
+    name TEXT PRIMARY KEY,
+    next_row INTEGER NOT NULL
+);
+"""
+
+
+def make_key(*parts):
+    """Build a stable idempotency key from the given parts"""
+    return hashlib.sha256('\0'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+
+
+class Outbox:
+    """Crash-safe on-disk queue of outgoing posts backed by SQLite in WAL mode.
+
+    Every post is written here before it is sent, keyed by an idempotency
+    key so re-queuing the same CSV row is a no-op. Delivery is at-least-once:
+    a post is only marked 'sent' after the API call returns, so anything
+    interrupted mid-flight is sent again on resume.
+
+    Enqueues are committed immediately (one transaction per call, however
+    many rows). Status updates are group-committed: they are flushed after
+    commit_batch writes or commit_interval seconds, whichever comes first.
+    Losing an unflushed status update can only cause a re-send, never a lost
+    post. With synchronous=NORMAL, WAL commits do not fsync each row.
+    """
+
+    def __init__(self, path='outbox.db', commit_batch=64, commit_interval=1.0):
+        self.path = path
+        self.commit_batch = commit_batch
+        self.commit_interval = commit_interval
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self._dirty = 0
+        self._flush_timer = None
+        self._closed = False
+
+    def _flush_locked(self):
+        if self._closed:
+            return
+        if self.conn.in_transaction:
+            self.conn.commit()
+        self._dirty = 0
+        if self._flush_timer:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+    def flush(self):
+        """Commit any buffered status updates"""
+        with self._lock:
+            self._flush_locked()
+
+    def _write_state(self, sql, params):
+        """Run a status update as part of the current group commit"""
+        with self._lock:
+            if not self.conn.in_transaction:
+                self.conn.execute('BEGIN')
+            self.conn.execute(sql, params)
+            self._dirty += 1
+            if self._dirty >= self.commit_batch:
+                self._flush_locked()
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.commit_interval, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def enqueue(self, text, key=None, due=None):
+        """Add a single post and return its id"""
+        return self.enqueue_many([(key, text, due)])[0]
+
+    def enqueue_many(self, items):
+        """Add many (key, text, due) posts in one transaction
+
+        A key of None gets a random key. Posts whose key is already present
+        are left untouched. Returns the ids of all given posts, in order.
+        """
+        now = time.time()
+        rows = [(key or uuid.uuid4().hex, text, due, now, now) for key, text, due in items]
+        with self._lock:
+            if not self.conn.in_transaction:
+                self.conn.execute('BEGIN')
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO posts (idem_key, text, due, created, updated) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            ids = [self.conn.execute("SELECT id FROM posts WHERE idem_key = ?", (row[0],)).fetchone()['id']
+                   for row in rows]
+            self._flush_locked()
+        return ids
+
+    def get(self, post_id):
+        """Return the stored row for a post"""
+        with self._lock:
+            return self.conn.execute("SELECT * FROM posts WHERE id = ?", (post_id,)).fetchone()
+
+    def claim(self, post_id):
+        """Mark a post as in flight and return it, or None if it was already sent or given up on"""
+        with self._lock:
+            entry = self.get(post_id)
+            if entry is None or entry['status'] in ('sent', 'failed'):
+                return None
+            self._write_state(
+                "UPDATE posts SET status = 'sending', attempts = attempts + 1, updated = ? WHERE id = ?",
+                (time.time(), post_id)
+            )
+            return entry
+
+    def set_due(self, post_id, due):
+        self._write_state("UPDATE posts SET due = ?, updated = ? WHERE id = ?", (due, time.time(), post_id))
+
+    def mark_sent(self, post_id, tweet_id=None):
+        self._write_state(
+            "UPDATE posts SET status = 'sent', tweet_id = ?, error = NULL, updated = ? WHERE id = ?",
+            (tweet_id, time.time(), post_id)
+        )
+
+    def mark_failed(self, post_id, error, retry=True):
+        """Record a failed attempt; retried posts go back to 'pending'"""
+        status = 'pending' if retry else 'failed'
+        self._write_state(
+            "UPDATE posts SET status = ?, error = ?, updated = ? WHERE id = ?",
+            (status, str(error), time.time(), post_id)
+        )
+
+    def sent_since(self, timestamp):
+        """Return how many posts were confirmed sent since timestamp"""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM posts WHERE status = 'sent' AND updated >= ?", (timestamp,)
+            ).fetchone()[0]
+
+    def sent_posts(self):
+        """Return (text, tweet_id) for every post confirmed sent, oldest first"""
+        with self._lock:
+            return [(row['text'], row['tweet_id']) for row in self.conn.execute(
+                "SELECT text, tweet_id FROM posts WHERE status = 'sent' ORDER BY id"
+            )]
+
+    def progress(self, source):
+        """Return the first row of a source that has not been enqueued yet"""
+        with self._lock:
+            row = self.conn.execute("SELECT next_row FROM sources WHERE name = ?", (source,)).fetchone()
+            return row['next_row'] if row else 0
+
+    def set_progress(self, source, next_row):
+        self._write_state(
+            "INSERT INTO sources (name, next_row) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET next_row = MAX(next_row, excluded.next_row)",
+            (source, next_row)
+        )
+
+    def unsent(self):
+        """Return scheduled posts that have not been confirmed as sent, oldest due first"""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT * FROM posts WHERE status IN ('pending', 'sending') AND due IS NOT NULL "
+                "ORDER BY due, id"
+            ).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._closed = True
+            self.conn.close()
+        logging.info("Outbox closed")
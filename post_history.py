@@ -0,0 +1,279 @@
+import hashlib
+import logging
+import operator
+import re
+import sqlite3
+import struct
+import threading
+import time
+from array import array
+from collections import namedtuple
+
+# batch_index is set instead of post_id when precheck matches an earlier text in the same batch
+Match = namedtuple('Match', ['post_id', 'similarity', 'text', 'tweet_id', 'batch_index'], defaults=(None,))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL,
+    tweet_id TEXT,
+    signature BLOB NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    hash INTEGER NOT NULL,
+    post_id INTEGER NOT NULL,
+    PRIMARY KEY (band, hash, post_id)
+) WITHOUT ROWID;
+"""
+
+# Scratch tables for PostHistory.precheck, in a temporary database that spills to disk
+BATCH_SCHEMA = """
+CREATE TABLE history (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE TABLE bands (
+    band INTEGER NOT NULL,
+    hash INTEGER NOT NULL,
+    post_id INTEGER NOT NULL,
+    PRIMARY KEY (band, hash, post_id)
+) WITHOUT ROWID;
+"""
+
+URL_RE = re.compile(r'https?://\S+')
+NON_WORD_RE = re.compile(r'[^\w#@]+')
+MAX_CANDIDATES = 200
+
+
+def normalize(text):
+    """Lower-case, drop links and punctuation, collapse whitespace"""
+    text = URL_RE.sub(' ', text.lower())
+    return ' '.join(NON_WORD_RE.sub(' ', text).split())
+
+
+def _hash64(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+class MinHasher:
+    """One-permutation MinHash over character shingles.
+
+    Each shingle is hashed once; the low bits pick one of num_perm bins and
+    the bin keeps the minimum of the remaining bits. Empty bins borrow from
+    the next non-empty bin (rotation densification). This gives a
+    num_perm-value signature for the cost of one hash per shingle, which is
+    what keeps a check well under a millisecond.
+    """
+
+    def __init__(self, num_perm=64, shingle_size=5):
+        if num_perm & (num_perm - 1):
+            raise ValueError("num_perm must be a power of two")
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._shift = num_perm.bit_length() - 1
+        self._mask = num_perm - 1
+
+    def shingles(self, text):
+        text = normalize(text)
+        k = self.shingle_size
+        if len(text) <= k:
+            return {text} if text else set()
+        return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+    def signature(self, text):
+        """Return the MinHash signature of text, or None if it has no content"""
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        empty = (1 << (64 - self._shift)) - 1
+        bins = [empty + 1] * self.num_perm
+        for shingle in shingles:
+            h = _hash64(shingle.encode('utf-8'))
+            index = h & self._mask
+            value = h >> self._shift
+            if value < bins[index]:
+                bins[index] = value
+        for i in range(self.num_perm):
+            if bins[i] > empty:
+                for offset in range(1, self.num_perm):
+                    donor = bins[(i + offset) % self.num_perm]
+                    if donor <= empty:
+                        bins[i] = (donor + offset * 0x9E3779B97F4A7C15) & empty
+                        break
+        return bins
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(map(operator.eq, a, b)) / len(a)
+
+
+class PostHistory:
+    """Index of everything the bot has posted, for catching near-duplicates before sending.
+
+    Texts are reduced to MinHash signatures and bucketed with LSH: the
+    signature is split into `bands` bands and two posts become candidates
+    when any band matches exactly. Candidates are then compared on the
+    full signature against `threshold` (estimated Jaccard similarity of
+    5-character shingles, after dropping links, case and punctuation).
+    Lookups are a single indexed SQLite query, so the check stays fast
+    with millions of posts on disk.
+    """
+
+    def __init__(self, path='post_history.db', threshold=0.8, num_perm=64, bands=16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self._check_layout(f"{num_perm}x{bands}")
+
+    def _check_layout(self, layout):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'layout'").fetchone()
+        if row is None:
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('layout', ?)", (layout,))
+            self.conn.commit()
+        elif row[0] != layout:
+            raise ValueError(f"Post history was built with {row[0]} signatures, not {layout}; delete it to rebuild")
+
+    def _band_hashes(self, signature):
+        """Return one signed 64-bit hash per band, as SQLite stores them"""
+        hashes = []
+        for band in range(self.bands):
+            values = signature[band * self.rows:(band + 1) * self.rows]
+            h = _hash64(struct.pack(f'<B{self.rows}Q', band, *values))
+            hashes.append(h - (1 << 64) if h >= 1 << 63 else h)
+        return hashes
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def _candidates(self, band_hashes, conn=None):
+        conn = conn or self.conn
+        clause = ' OR '.join(['(band = ? AND hash = ?)'] * len(band_hashes))
+        params = [value for band, h in enumerate(band_hashes) for value in (band, h)]
+        rows = conn.execute(
+            f"SELECT DISTINCT post_id FROM bands WHERE {clause} LIMIT {MAX_CANDIDATES}", params
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def find_similar(self, text, threshold=None, limit=1):
+        """Return up to limit past posts at least threshold-similar to text, most similar first"""
+        threshold = self.threshold if threshold is None else threshold
+        signature = self.hasher.signature(text)
+        if signature is None:
+            return []
+        return self._matches(signature, threshold, limit)
+
+    def _matches(self, signature, threshold, limit):
+        with self._lock:
+            candidates = self._candidates(self._band_hashes(signature))
+            if not candidates:
+                return []
+            rows = self.conn.execute(
+                f"SELECT id, text, tweet_id, signature FROM history WHERE id IN ({','.join('?' * len(candidates))})",
+                candidates
+            ).fetchall()
+        matches = []
+        for post_id, past_text, tweet_id, blob in rows:
+            score = similarity(signature, array('Q', blob))
+            if score >= threshold:
+                matches.append(Match(post_id, score, past_text, tweet_id))
+        matches.sort(key=lambda m: -m.similarity)
+        return matches[:limit]
+
+    def check(self, text, threshold=None):
+        """Return the closest past post if text is a near-duplicate of it, else None"""
+        matches = self.find_similar(text, threshold)
+        return matches[0] if matches else None
+
+    def add_many(self, items):
+        """Record many (text, tweet_id) posts in one transaction; returns how many were indexed"""
+        now = time.time()
+        added = 0
+        with self._lock:
+            for text, tweet_id in items:
+                signature = self.hasher.signature(text)
+                if signature is None:
+                    continue
+                post_id = self.conn.execute(
+                    "INSERT INTO history (text, tweet_id, signature, created) VALUES (?, ?, ?, ?)",
+                    (text, tweet_id, array('Q', signature).tobytes(), now)
+                ).lastrowid
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO bands (band, hash, post_id) VALUES (?, ?, ?)",
+                    [(band, h, post_id) for band, h in enumerate(self._band_hashes(signature))]
+                )
+                added += 1
+            self.conn.commit()
+        return added
+
+    def add(self, text, tweet_id=None):
+        return self.add_many([(text, tweet_id)]) == 1
+
+    def precheck(self, texts, threshold=None):
+        """Check a batch of candidate posts before scheduling them
+
+        Yields (index, text, match) for every text that is a near-duplicate
+        of a past post or of an earlier text in the same batch. For a match
+        within the batch, match.post_id is None and match.batch_index holds
+        the index of the earlier text. Nothing is written to the history;
+        the batch is indexed in a temporary database, so memory use does not
+        grow with its size.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        batch = sqlite3.connect('')
+        try:
+            batch.executescript(BATCH_SCHEMA)
+            for index, text in enumerate(texts):
+                signature = self.hasher.signature(text)
+                if signature is None:
+                    continue
+                matches = self._matches(signature, threshold, 1)
+                match = matches[0] if matches else None
+                band_hashes = self._band_hashes(signature)
+                if match is None:
+                    match = self._batch_match(batch, signature, band_hashes, threshold)
+                if match is not None:
+                    yield index, text, match
+                    continue
+                batch.execute("INSERT INTO history (id, text, signature) VALUES (?, ?, ?)",
+                              (index, text, array('Q', signature).tobytes()))
+                batch.executemany("INSERT OR IGNORE INTO bands (band, hash, post_id) VALUES (?, ?, ?)",
+                                  [(band, h, index) for band, h in enumerate(band_hashes)])
+        finally:
+            batch.close()
+
+    def _batch_match(self, batch, signature, band_hashes, threshold):
+        """Return the most similar earlier text of a precheck batch, or None"""
+        candidates = self._candidates(band_hashes, batch)
+        if not candidates:
+            return None
+        rows = batch.execute(
+            f"SELECT id, text, signature FROM history WHERE id IN ({','.join('?' * len(candidates))})", candidates
+        ).fetchall()
+        best = None
+        for index, earlier, blob in rows:
+            score = similarity(signature, array('Q', blob))
+            if score >= threshold and (best is None or score > best.similarity):
+                best = Match(None, score, earlier, None, index)
+        return best
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+        logging.info("Post history closed")
@@ -0,0 +1,118 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+# Search query length limit for the Basic/self-serve tiers; Pro allows 1024
+MAX_QUERY_LENGTH = 512
+SEPARATOR = ' OR '
+
+
+def plan_queries(sources, max_length=MAX_QUERY_LENGTH, operator='from:', extra=''):
+    """Pack sources into the fewest `from:a OR from:b ...` queries under max_length
+
+    Uses first-fit decreasing bin packing. Sources are sorted first so the
+    same list always yields the same shards, which keeps their since_id
+    cursors stable between runs. `extra` operators (e.g. "-is:retweet") are
+    appended to every shard and count towards the limit.
+    """
+    wrap = 2 if extra else 0
+    budget = max_length - (len(extra) + 1 + wrap if extra else 0)
+    terms = sorted({f"{operator}{s}" for s in sources}, key=lambda t: (-len(t), t))
+    shards = []
+    for term in terms:
+        if len(term) > budget:
+            raise ValueError(f"Source {term!r} does not fit in a {max_length} character query")
+        for shard in shards:
+            if shard['length'] + len(SEPARATOR) + len(term) <= budget:
+                shard['terms'].append(term)
+                shard['length'] += len(SEPARATOR) + len(term)
+                break
+        else:
+            shards.append({'terms': [term], 'length': len(term)})
+
+    queries = []
+    for shard in shards:
+        query = SEPARATOR.join(sorted(shard['terms']))
+        queries.append(f"({query}) {extra}" if extra else query)
+    return queries
+
+
+class ShardedSearch:
+    """Run a planned set of source queries in parallel and merge the results.
+
+    Each cycle runs as many shards as the search budget allows, rotating
+    through them round-robin so every source is covered over time. Results
+    are de-duplicated by tweet id and returned newest first (tweet ids are
+    time-ordered snowflakes).
+
+    With an AdaptivePoller, only shards that are due are searched, each with
+    the page count the poller asks for, and every result is reported back
+    to it so it can schedule the shard's next poll.
+    """
+
+    def __init__(self, searcher, rate_limiter=None, max_workers=4, max_length=MAX_QUERY_LENGTH, poller=None):
+        self.searcher = searcher
+        self.rate_limiter = rate_limiter
+        self.max_workers = max_workers
+        self.max_length = max_length
+        self.poller = poller
+        self._offset = 0
+
+    def _shards_this_cycle(self, queries, action):
+        keys = {f"{action}:{query}": query for query in queries}
+        if self.poller:
+            self.poller.retain(keys, f"{action}:")
+        count = len(queries)
+        if self.rate_limiter:
+            count = min(count, self.rate_limiter.remaining('search'))
+        if count <= 0:
+            return []
+        if self.poller:
+            return [keys[key] for key in self.poller.due(keys)][:count]
+        start = self._offset % len(queries)
+        self._offset = start + count
+        return [queries[(start + i) % len(queries)] for i in range(count)]
+
+    def next_poll(self, sources, action, operator='from:'):
+        """Seconds until the next shard of sources is due and can be searched (0 without a poller)"""
+        if not self.poller:
+            return 0.0
+        queries = plan_queries(sources, self.max_length, operator)
+        wait = self.poller.next_wait([f"{action}:{query}" for query in queries])
+        # Due shards wait for the search window to reset when the budget is spent
+        if wait <= 0 and self.rate_limiter:
+            wait = self.rate_limiter.next_available('search')
+        return wait
+
+    def search(self, sources, action, operator='from:', **kwargs):
+        """Return merged new tweets from all sources, skipping ones already handled by action
+
+        With operator='' the sources are plain search terms (e.g. keywords).
+        """
+        queries = plan_queries(sources, self.max_length, operator)
+        shards = self._shards_this_cycle(queries, action)
+        if shards and len(shards) < len(queries):
+            logging.info("Searching %d of %d source shards this cycle", len(shards), len(queries))
+
+        def run(query):
+            key = f"{action}:{query}"
+            on_result = None
+            if self.poller:
+                def on_result(tweets, pages, more):
+                    self.poller.observe(key, tweets, pages, more)
+            return self.searcher.search(
+                query,
+                cursor_key=key,
+                skip_seen=action,
+                max_pages=self.poller.pages(key) if self.poller else 1,
+                on_result=on_result,
+                **kwargs
+            )
+
+        merged = {}
+        if not shards:
+            return []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for tweets in pool.map(run, shards):
+                for tweet in tweets:
+                    merged.setdefault(int(tweet.id), tweet)
+        return [merged[tweet_id] for tweet_id in sorted(merged, reverse=True)]
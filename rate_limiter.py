@@ -0,0 +1,209 @@
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+# (HTTP method, path pattern) -> endpoint name used throughout the bot
+ENDPOINTS = [
+    ('GET', re.compile(r'^/2/tweets/search/recent$'), 'search'),
+    ('POST', re.compile(r'^/2/users/\d+/likes$'), 'like'),
+    ('POST', re.compile(r'^/2/users/\d+/retweets$'), 'retweet'),
+    ('POST', re.compile(r'^/2/tweets$'), 'create_tweet'),
+    ('GET', re.compile(r'^/2/users/me$'), 'get_me'),
+    ('GET', re.compile(r'^/2/users/by$'), 'get_users'),
+]
+
+# Conservative (requests, window seconds) defaults until the API tells us otherwise
+DEFAULT_LIMITS = {
+    'search': (60, 900),
+    'like': (200, 86400),
+    'retweet': (5, 900),
+    'create_tweet': (100, 900),
+    'get_me': (75, 900),
+    'get_users': (100, 86400),
+}
+
+
+def endpoint_for(method, url):
+    """Map a request to one of the endpoint names above, or None"""
+    path = urlparse(url).path
+    for endpoint_method, pattern, name in ENDPOINTS:
+        if method == endpoint_method and pattern.match(path):
+            return name
+    return None
+
+
+class TokenBucket:
+    """Request budget for one endpoint over a fixed window.
+
+    X rate limits are fixed windows: a budget of `limit` calls that is
+    refilled in full at the reset time. The bucket follows that model and is
+    re-seeded from the x-rate-limit-* headers on every response, so local
+    accounting never drifts far from what the server thinks.
+    """
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = time.time() + window
+
+    def _refill(self, now):
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.window
+
+    def next_available(self, now):
+        self._refill(now)
+        return 0.0 if self.remaining > 0 else max(0.0, self.reset_at - now)
+
+    def consume(self, now):
+        self._refill(now)
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+    def seed(self, limit, remaining, reset_at):
+        self.limit = limit
+        self.remaining = remaining
+        self.reset_at = reset_at
+
+
+class RateLimiter:
+    """Central request budget for every tweepy.Client call.
+
+    Keeps one TokenBucket per endpoint plus the daily post cap. Attach it to
+    a client to have its buckets seeded from response headers; callers then
+    ask `next_available(endpoint)` or `acquire(endpoint)` instead of sleeping
+    on fixed timers.
+    """
+
+    def __init__(self, limits=None, daily_post_cap=17):
+        self._lock = threading.Lock()
+        self._buckets = {name: TokenBucket(*limit) for name, limit in {**DEFAULT_LIMITS, **(limits or {})}.items()}
+        self.daily_post_cap = daily_post_cap
+        self._posts_today = 0
+        self._day_reset_at = self._next_midnight()
+
+    @staticmethod
+    def _next_midnight():
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+    def attach(self, client):
+        """Seed buckets from the headers of every response the client receives"""
+        client.session.hooks.setdefault('response', []).append(self._on_response)
+
+    def _on_response(self, response, *args, **kwargs):
+        endpoint = endpoint_for(response.request.method, response.request.url)
+        if endpoint is None:
+            return
+        headers = response.headers
+        try:
+            if 'x-rate-limit-remaining' in headers:
+                self.update(
+                    endpoint,
+                    int(headers['x-rate-limit-limit']),
+                    int(headers['x-rate-limit-remaining']),
+                    float(headers['x-rate-limit-reset'])
+                )
+            if endpoint == 'create_tweet' and 'x-user-limit-24hour-remaining' in headers:
+                self.update_daily(
+                    int(headers['x-user-limit-24hour-remaining']),
+                    float(headers['x-user-limit-24hour-reset'])
+                )
+        except (KeyError, ValueError) as e:
+            logging.warning("Could not parse rate limit headers for %s: %s", endpoint, e)
+
+    def _bucket(self, endpoint):
+        bucket = self._buckets.get(endpoint)
+        if bucket is None:
+            bucket = self._buckets[endpoint] = TokenBucket(*DEFAULT_LIMITS.get(endpoint, (15, 900)))
+        return bucket
+
+    def update(self, endpoint, limit, remaining, reset_at):
+        """Seed an endpoint's bucket from the API's rate limit headers"""
+        with self._lock:
+            self._bucket(endpoint).seed(limit, remaining, reset_at)
+
+    def update_daily(self, remaining, reset_at):
+        """Seed the daily post cap from the API's 24-hour limit headers"""
+        with self._lock:
+            self._posts_today = max(self._posts_today, self.daily_post_cap - remaining)
+            self._day_reset_at = reset_at
+
+    def seed_posts_today(self, count):
+        """Start the daily post count from posts already sent today"""
+        with self._lock:
+            self._posts_today = count
+
+    def _daily_wait(self, now):
+        if now >= self._day_reset_at:
+            self._posts_today = 0
+            self._day_reset_at = self._next_midnight()
+        if self._posts_today < self.daily_post_cap:
+            return 0.0
+        return max(0.0, self._day_reset_at - now)
+
+    def next_available(self, endpoint):
+        """Return how many seconds until endpoint can be called (0 if now)"""
+        now = time.time()
+        with self._lock:
+            wait = self._bucket(endpoint).next_available(now)
+            if endpoint == 'create_tweet':
+                wait = max(wait, self._daily_wait(now))
+            return wait
+
+    def acquire(self, endpoint):
+        """Take one call from endpoint's budget; returns False if none is left"""
+        now = time.time()
+        with self._lock:
+            if endpoint == 'create_tweet' and self._daily_wait(now) > 0:
+                return False
+            if not self._bucket(endpoint).consume(now):
+                return False
+            if endpoint == 'create_tweet':
+                self._posts_today += 1
+            return True
+
+    def wait(self, endpoint, stop_event=None):
+        """Block until endpoint can be called and take one call from its budget
+
+        Returns False if stop_event was set while waiting.
+        """
+        while not self.acquire(endpoint):
+            delay = max(self.next_available(endpoint), 0.05)
+            logging.info("Rate budget for %s exhausted, waiting %.0fs", endpoint, delay)
+            if stop_event is not None:
+                if stop_event.wait(delay):
+                    return False
+            else:
+                time.sleep(delay)
+        return True
+
+    def remaining(self, endpoint):
+        """Return how many calls are left in endpoint's current window"""
+        with self._lock:
+            bucket = self._bucket(endpoint)
+            bucket.next_available(time.time())
+            return bucket.remaining
+
+    def reset_in(self, endpoint):
+        """Return seconds until endpoint's current window resets"""
+        now = time.time()
+        with self._lock:
+            bucket = self._bucket(endpoint)
+            bucket.next_available(now)
+            return max(0.0, bucket.reset_at - now)
+
+    def status(self):
+        """Return {endpoint: (remaining, seconds until reset)} for display"""
+        now = time.time()
+        with self._lock:
+            status = {name: (b.remaining, max(0, int(b.reset_at - now))) for name, b in self._buckets.items()}
+            self._daily_wait(now)
+            status['daily_posts'] = (self.daily_post_cap - self._posts_today, max(0, int(self._day_reset_at - now)))
+            return status
@@ -0,0 +1,244 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+DAY_NAMES = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+# Failed posts are never retried sooner than this, even with a zero interval
+MIN_RETRY_DELAY = 60
+
+
+class PostingWindow:
+    """Cron-like posting window, e.g. "mon-fri 09:00-17:30" or "sat,sun 10:00-14:00".
+
+    A window whose end is not after its start ("fri 22:00-02:00") runs past
+    midnight; the days are the days it opens on.
+    """
+
+    def __init__(self, days=None, start=None, end=None):
+        self.days = set(days) if days is not None else set(range(7))
+        self.start = start or (0, 0)
+        self.end = end or (24, 0)
+
+    @classmethod
+    def parse(cls, spec):
+        """Parse a window spec of the form '[days] [HH:MM-HH:MM]'"""
+        days = None
+        start = end = None
+        for part in spec.lower().split():
+            if ':' in part:
+                first, last = part.split('-')
+                start = tuple(int(x) for x in first.split(':'))
+                end = tuple(int(x) for x in last.split(':'))
+            else:
+                days = set()
+                for group in part.split(','):
+                    if '-' in group:
+                        first, last = (DAY_NAMES.index(d[:3]) for d in group.split('-'))
+                        day = first
+                        while True:
+                            days.add(day)
+                            if day == last:
+                                break
+                            day = (day + 1) % 7
+                    else:
+                        days.add(DAY_NAMES.index(group[:3]))
+        return cls(days, start, end)
+
+    def _bounds(self, day):
+        start = day.replace(hour=0, minute=0, second=0, microsecond=0)
+        opens = start + timedelta(hours=self.start[0], minutes=self.start[1])
+        closes = start + timedelta(hours=self.end[0], minutes=self.end[1])
+        if closes <= opens:
+            # Overnight window such as 22:00-02:00: it closes the next day
+            closes += timedelta(days=1)
+        return opens, closes
+
+    def next_open(self, timestamp):
+        """Return the earliest timestamp >= the given one that falls inside the window"""
+        moment = datetime.fromtimestamp(timestamp)
+        # Start with yesterday, whose overnight window may still be open
+        for offset in range(-1, 8):
+            day = moment + timedelta(days=offset)
+            if day.weekday() not in self.days:
+                continue
+            opens, closes = self._bounds(day)
+            if moment < opens:
+                return opens.timestamp()
+            if moment < closes:
+                return timestamp
+        raise ValueError("Posting window never opens")
+
+    def __str__(self):
+        days = ','.join(DAY_NAMES[d] for d in sorted(self.days))
+        return f"{days} {self.start[0]:02d}:{self.start[1]:02d}-{self.end[0]:02d}:{self.end[1]:02d}"
+
+
+class PostScheduler:
+    """Deadline-heap scheduler that sleeps exactly until the next post is due.
+
+    Posts are kept in a min-heap keyed on their due timestamp and a single
+    background thread waits on a condition variable until the earliest
+    deadline, so an idle scheduler costs no CPU wakeups regardless of how
+    many posts are queued. post_func returns True when a post is done,
+    False to retry it and None to drop it. A retry waits retry_delay (at
+    least MIN_RETRY_DELAY), or longer if retry_after, called after the
+    failure, returns more seconds (e.g. until the rate budget refills).
+    """
+
+    def __init__(self, post_func, interval=7200, jitter=0, window=None, retry_delay=None, retry_after=None):
+        self.post_func = post_func
+        self.retry_after = retry_after
+        self.interval = interval
+        self.jitter = jitter
+        self.window = PostingWindow.parse(window) if isinstance(window, str) else window
+        self.retry_delay = retry_delay if retry_delay is not None else interval
+        self._heap = []
+        self._queued = set()
+        self._counter = itertools.count()
+        self._last_slot = None
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def _adjust(self, due):
+        """Apply jitter and the posting window to a due timestamp"""
+        if self.jitter:
+            due += random.uniform(-self.jitter, self.jitter)
+        if self.window:
+            due = self.window.next_open(due)
+        return due
+
+    def plan(self, at=None):
+        """Return the due timestamp for a post at an explicit time or in the next free interval slot"""
+        if isinstance(at, datetime):
+            at = at.timestamp()
+        with self._cond:
+            if at is None:
+                base = max(self._last_slot or time.time(), time.time())
+                slot = base + self.interval
+                # The next slot counts from when this one can actually post, so slots
+                # that fall while the window is closed do not pile up at its opening
+                if self.window:
+                    slot = self.window.next_open(slot)
+                self._last_slot = slot
+                return self._adjust(slot)
+            return self._adjust(at)
+
+    def push(self, item, due):
+        """Queue an item at an exact due timestamp; items already queued are ignored"""
+        with self._cond:
+            if item in self._queued:
+                return False
+            self._queued.add(item)
+            heapq.heappush(self._heap, (due, next(self._counter), item))
+            self._cond.notify()
+        return True
+
+    def add(self, item, at=None):
+        """Queue an item at an explicit time or in the next free interval slot"""
+        due = self.plan(at)
+        self.push(item, due)
+        return due
+
+    def add_many(self, posts):
+        """Queue many posts; each item is either a post or a (post, at) tuple"""
+        count = 0
+        for post in posts:
+            if isinstance(post, tuple):
+                self.add(*post)
+            else:
+                self.add(post)
+            count += 1
+        return count
+
+    def pending(self):
+        """Return the number of queued posts"""
+        with self._cond:
+            return len(self._heap)
+
+    def __contains__(self, item):
+        with self._cond:
+            return item in self._queued
+
+    def next_due(self):
+        """Return the timestamp of the next due post, or None if the queue is empty"""
+        with self._cond:
+            return self._heap[0][0] if self._heap else None
+
+    def clear(self):
+        """Drop all queued posts"""
+        with self._cond:
+            self._heap.clear()
+            self._queued.clear()
+            self._last_slot = None
+            self._cond.notify()
+
+    def start(self):
+        """Start the background posting thread"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name='post-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the background thread, keeping any queued posts"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_running(self):
+        return self._running
+
+    def _next_ready(self):
+        """Block until a post is due or the scheduler stops"""
+        with self._cond:
+            while self._running:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                delay = self._heap[0][0] - time.time()
+                if delay <= 0:
+                    item = heapq.heappop(self._heap)
+                    self._queued.discard(item[2])
+                    return item
+                self._cond.wait(delay)
+            return None
+
+    def _retry_wait(self):
+        delay = max(self.retry_delay, MIN_RETRY_DELAY)
+        if self.retry_after is not None:
+            try:
+                delay = max(delay, self.retry_after())
+            except Exception as e:
+                logging.error("Could not get the retry time: %s", e)
+        return delay
+
+    def _run(self):
+        while True:
+            item = self._next_ready()
+            if item is None:
+                return
+            _, _, post = item
+            try:
+                posted = self.post_func(post)
+            except Exception as e:
+                logging.error("Scheduled post failed: %s", e)
+                posted = False
+            if posted is None:
+                logging.info("Scheduled post was rejected and will not be retried")
+            elif not posted:
+                delay = self._retry_wait()
+                self.push(post, self._adjust(time.time() + delay))
+                logging.info("Scheduled post will be retried in %.0f seconds", delay)
+            elif not self.pending():
+                print("\nAll scheduled tweets have been posted.")
+                logging.info("All scheduled tweets have been posted.")
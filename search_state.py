@@ -0,0 +1,233 @@
+import hashlib
+import logging
+import math
+import sqlite3
+import threading
+import time
+
+import tweepy
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursors (
+    key TEXT PRIMARY KEY,
+    since_id TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sweeps (
+    key TEXT PRIMARY KEY,
+    newest_id TEXT NOT NULL,
+    next_token TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS seen (
+    action TEXT NOT NULL,
+    tweet_id INTEGER NOT NULL,
+    PRIMARY KEY (action, tweet_id)
+) WITHOUT ROWID;
+"""
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over integer ids using double hashing"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(str(item).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class SearchState:
+    """Persistent since_id cursors and seen/acted-on tweet ids for the automations.
+
+    Seen ids live in SQLite; an in-memory Bloom filter per action sits in
+    front of the table so the common "never seen" answer costs no disk
+    access. A Bloom hit is confirmed against the table before it is trusted.
+    """
+
+    def __init__(self, path='search_state.db', bloom_capacity=100000):
+        self.bloom_capacity = bloom_capacity
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self._blooms = {}
+
+    def get_cursor(self, key):
+        with self._lock:
+            row = self.conn.execute("SELECT since_id FROM cursors WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_cursor(self, key, since_id):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cursors (key, since_id, updated) VALUES (?, ?, ?)",
+                (key, str(since_id), time.time())
+            )
+            self.conn.commit()
+
+    def get_sweep(self, key):
+        """Return (newest_id, next_token) of a search for key that stopped with pages unread, or None"""
+        with self._lock:
+            row = self.conn.execute("SELECT newest_id, next_token FROM sweeps WHERE key = ?", (key,)).fetchone()
+        return tuple(row) if row else None
+
+    def set_sweep(self, key, newest_id, next_token):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sweeps (key, newest_id, next_token, updated) VALUES (?, ?, ?, ?)",
+                (key, str(newest_id), next_token, time.time())
+            )
+            self.conn.commit()
+
+    def finish_sweep(self, key, newest_id):
+        """Move the cursor for key to newest_id and forget any unfinished sweep, in one transaction"""
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cursors (key, since_id, updated) VALUES (?, ?, ?)",
+                (key, str(newest_id), time.time())
+            )
+            self.conn.execute("DELETE FROM sweeps WHERE key = ?", (key,))
+            self.conn.commit()
+
+    def _bloom(self, action):
+        """Return the Bloom filter for action, (re)building it from disk if needed"""
+        bloom = self._blooms.get(action)
+        if bloom is None or bloom.count > bloom.capacity:
+            count = self.conn.execute("SELECT COUNT(*) FROM seen WHERE action = ?", (action,)).fetchone()[0]
+            bloom = BloomFilter(max(self.bloom_capacity, count * 2))
+            for (tweet_id,) in self.conn.execute("SELECT tweet_id FROM seen WHERE action = ?", (action,)):
+                bloom.add(tweet_id)
+            self._blooms[action] = bloom
+        return bloom
+
+    def is_seen(self, action, tweet_id):
+        tweet_id = int(tweet_id)
+        with self._lock:
+            if tweet_id not in self._bloom(action):
+                return False
+            return self.conn.execute(
+                "SELECT 1 FROM seen WHERE action = ? AND tweet_id = ?", (action, tweet_id)
+            ).fetchone() is not None
+
+    def mark_seen(self, action, tweet_ids):
+        """Record one or more tweet ids as processed for action"""
+        if isinstance(tweet_ids, (int, str)):
+            tweet_ids = [tweet_ids]
+        tweet_ids = [int(t) for t in tweet_ids]
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO seen (action, tweet_id) VALUES (?, ?)",
+                [(action, t) for t in tweet_ids]
+            )
+            self.conn.commit()
+            bloom = self._bloom(action)
+            for tweet_id in tweet_ids:
+                bloom.add(tweet_id)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class IncrementalSearcher:
+    """Paginated search_recent_tweets that only returns tweets newer than the last run.
+
+    Each cursor key remembers the newest tweet id seen; the next search for
+    that key passes it as since_id so the API only returns new tweets.
+    When a search stops at max_pages or the search budget with older pages
+    still unread, the cursor stays put and the pagination token is saved;
+    the next search resumes from it, and the cursor only advances once
+    every page down to since_id has been read. (The first search for a key
+    just takes the newest pages.) Results can also be
+    filtered against the seen index for an action.
+    """
+
+    MAX_USERS = 50000
+
+    def __init__(self, client, state, rate_limiter=None):
+        self.client = client
+        self.state = state
+        self.rate_limiter = rate_limiter
+        # Author data from expansions=['author_id'] responses, by user id
+        self.users = {}
+
+    def search(self, query, cursor_key=None, skip_seen=None, max_pages=3, max_results=100, on_result=None,
+               **kwargs):
+        """Return new tweets for query, newest first
+
+        cursor_key names the persisted cursor (pass None to search without
+        one). Paging stops after max_pages or when the search budget runs
+        out; with a cursor, the next search picks up the unread pages. Tweets already marked seen for skip_seen are dropped.
+        on_result(tweets, pages, more) is called with everything fetched,
+        before that filtering; more is True if the API had further pages.
+        """
+        since_id = self.state.get_cursor(cursor_key) if cursor_key else None
+        params = dict(kwargs, query=query, max_results=max(10, min(100, max_results)))
+        if since_id:
+            params['since_id'] = since_id
+        # Carry on with the older pages an earlier search for this key left unread
+        sweep = self.state.get_sweep(cursor_key) if cursor_key else None
+        newest_id, next_token = sweep or (None, None)
+
+        tweets = []
+        pages = 0
+        for _ in range(max_pages):
+            if self.rate_limiter and not self.rate_limiter.acquire('search'):
+                break
+            pages += 1
+            if next_token:
+                params['next_token'] = next_token
+            try:
+                response = self.client.search_recent_tweets(**params)
+            except tweepy.errors.BadRequest as e:
+                if not sweep:
+                    raise
+                # The saved token has expired; its pages are out of reach, so start over from the top
+                logging.warning("Dropping unfinished search for %r: %s", query, e)
+                self.state.finish_sweep(cursor_key, newest_id)
+                return self.search(query, cursor_key, skip_seen, max_pages - pages, max_results, on_result,
+                                   **kwargs)
+            meta = response.meta or {}
+            if newest_id is None:
+                newest_id = meta.get('newest_id')
+            tweets.extend(response.data or [])
+            users = (response.includes or {}).get('users', [])
+            if len(self.users) + len(users) > self.MAX_USERS:
+                self.users.clear()
+            for user in users:
+                self.users[str(user.id)] = user.data
+            next_token = meta.get('next_token')
+            if not next_token:
+                break
+
+        if cursor_key and newest_id and pages:
+            # A first search has no gap to fill: older tweets were never wanted
+            if next_token and (since_id or sweep):
+                self.state.set_sweep(cursor_key, newest_id, next_token)
+            else:
+                self.state.finish_sweep(cursor_key, newest_id)
+        if on_result is not None and pages:
+            on_result(tweets, pages, bool(next_token))
+        if skip_seen:
+            fetched = len(tweets)
+            tweets = [t for t in tweets if not self.state.is_seen(skip_seen, t.id)]
+            if fetched != len(tweets):
+                logging.info("Skipped %d tweets already handled by %s for %r", fetched - len(tweets), skip_seen, query)
+        return tweets
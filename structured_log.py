@@ -0,0 +1,142 @@
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import time
+
+# Every line in the log has exactly these keys, in this order
+FIELDS = ('ts', 'level', 'logger', 'action', 'tweet_id', 'endpoint', 'latency', 'outcome', 'message')
+EVENT_FIELDS = ('action', 'tweet_id', 'endpoint', 'latency', 'outcome')
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line with the fixed FIELDS schema.
+
+    Structured fields come from `extra` (see log_event); records without
+    them, such as plain logging.info calls, get nulls.
+    """
+
+    def format(self, record):
+        message = record.getMessage()
+        if record.exc_text:
+            message = f"{message}\n{record.exc_text}"
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+        }
+        for field in EVENT_FIELDS:
+            entry[field] = getattr(record, field, None)
+        entry['message'] = message
+        return json.dumps(entry, separators=(',', ':'), default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread.
+
+    The stock QueueHandler formats every record in the calling thread;
+    here only tracebacks are rendered up front (they reference live frames)
+    and the %-args and JSON encoding are handled by the writer thread.
+    """
+
+    def prepare(self, record):
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class RotatingJsonFileHandler(logging.handlers.RotatingFileHandler):
+    """Size- and time-based rotation with gzip-compressed backups.
+
+    The file rolls over when it would exceed max_bytes or when
+    rotate_seconds have passed since it was opened, whichever comes first.
+    Backups are named bot.log.1.gz (newest) to bot.log.<backup_count>.gz.
+    """
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, backup_count=10, rotate_seconds=24 * 3600):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.rotate_seconds = rotate_seconds
+        self.namer = lambda name: f"{name}.gz"
+        self.rotator = self._compress
+        self.rollover_at = self._next_rollover()
+
+    def _next_rollover(self):
+        try:
+            opened = os.stat(self.baseFilename).st_mtime
+        except FileNotFoundError:
+            opened = time.time()
+        return opened + self.rotate_seconds if self.rotate_seconds else float('inf')
+
+    @staticmethod
+    def _compress(source, dest):
+        with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+    def shouldRollover(self, record):
+        if time.time() >= self.rollover_at and os.path.exists(self.baseFilename):
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.rotate_seconds if self.rotate_seconds else float('inf')
+
+
+def setup_logging(path='bot.log', level=logging.INFO, max_bytes=10 * 1024 * 1024, backup_count=10,
+                  rotate_seconds=24 * 3600):
+    """Route all logging through a queue to a background JSON-lines writer
+
+    Logging calls only put the record on a queue; formatting, JSON
+    encoding, file writes and rotation happen on the listener thread.
+    Handlers already on the root logger are replaced, like
+    basicConfig(force=True). Calling it again is a no-op. The listener is
+    flushed and stopped at exit (or by stop_logging).
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+    handler = RotatingJsonFileHandler(path, max_bytes, backup_count, rotate_seconds)
+    handler.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+        existing.close()
+    root.setLevel(level)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, handler)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Write out queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def log_event(action, outcome, tweet_id=None, endpoint=None, latency=None, message='', *args, level=logging.INFO):
+    """Log a structured event; message and args are %-formatted lazily, on the writer thread"""
+    logger = logging.getLogger()
+    if logger.isEnabledFor(level):
+        extra = {
+            'action': action,
+            'outcome': outcome,
+            'tweet_id': str(tweet_id) if tweet_id is not None else None,
+            'endpoint': endpoint,
+            'latency': round(latency, 4) if latency is not None else None,
+        }
+        logger.log(level, message, *args, extra=extra)
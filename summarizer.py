@@ -0,0 +1,102 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+MAP_PROMPT = ("Summarize the main points of these tweets about {topic} as a few short bullet points. "
+              "Ignore spam and repeats.\n\n{text}")
+REDUCE_PROMPT = ("Merge these partial summaries of tweets about {topic} into one set of short bullet points, "
+                 "keeping the most important points.\n\n{text}")
+FINAL_PROMPT = ("Write one tweet (under 280 characters) summarizing what people are saying about {topic}, "
+                "based on these notes. Only reply with the tweet.\n\n{text}")
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token) without needing a tokenizer"""
+    return len(text) // 4 + 1
+
+
+def chunk_tweets(tweets, max_tokens=3000, min_tokens=500, boundary=32):
+    """Split (id, text) tweets into chunks of at most max_tokens, oldest first
+
+    Chunk boundaries are content-defined: a chunk ends after a tweet whose
+    id hashes to 0 mod `boundary` (once it holds min_tokens), or when the
+    next tweet would push it over max_tokens. Because the cut points depend
+    on the tweets rather than their positions, running again with a few
+    newer tweets leaves the earlier chunks byte-for-byte identical, so
+    their summaries come straight from the LLM cache.
+    """
+    chunks = []
+    current = []
+    size = 0
+    for tweet_id, text in sorted(tweets, key=lambda t: int(t[0])):
+        line = ' '.join(text.split())
+        tokens = estimate_tokens(line)
+        if current and size + tokens > max_tokens:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(line)
+        size += tokens
+        digest = hashlib.blake2b(str(tweet_id).encode(), digest_size=4).digest()
+        if size >= min_tokens and int.from_bytes(digest, 'little') % boundary == 0:
+            chunks.append(current)
+            current, size = [], 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def pack(texts, max_tokens):
+    """Group texts in order into lists of at most max_tokens each"""
+    groups = []
+    current = []
+    size = 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if current and size + tokens > max_tokens:
+            groups.append(current)
+            current, size = [], 0
+        current.append(text)
+        size += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+class MapReduceSummarizer:
+    """Summarize any number of tweets with bounded prompt sizes.
+
+    Map: tweets are split into token-budgeted chunks and each chunk is
+    summarized concurrently. Reduce: the partial summaries are packed into
+    groups under the same budget and merged, level by level, until one set
+    of notes is left, which is turned into a single tweet. Every call goes
+    through the LLM handler's response cache, so unchanged chunks and
+    merges are never paid for twice.
+    """
+
+    def __init__(self, llm, chunk_tokens=3000, concurrency=8, max_tokens=300):
+        self.llm = llm
+        self.chunk_tokens = chunk_tokens
+        self.concurrency = concurrency
+        self.max_tokens = max_tokens
+
+    def _run_all(self, prompts):
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return list(pool.map(lambda prompt: self.llm.complete(prompt, max_tokens=self.max_tokens), prompts))
+
+    def summarize(self, tweets, topic):
+        """Return a tweet-length summary of (id, text) tweets about topic"""
+        chunks = chunk_tweets(tweets, self.chunk_tokens)
+        logging.info("Summarizing %d tweets about %s in %d chunks", len(tweets), topic, len(chunks))
+        notes = self._run_all([MAP_PROMPT.format(topic=topic, text='\n'.join(chunk)) for chunk in chunks])
+
+        level = 0
+        while len(notes) > 1:
+            groups = pack(notes, self.chunk_tokens)
+            if len(groups) == len(notes):
+                # Every note fills a group on its own; pair them up so the merge still converges
+                groups = [notes[i:i + 2] for i in range(0, len(notes), 2)]
+            level += 1
+            logging.info("Reduce level %d: merging %d partial summaries in %d groups", level, len(notes), len(groups))
+            notes = self._run_all([REDUCE_PROMPT.format(topic=topic, text='\n\n'.join(group)) for group in groups])
+
+        return self.llm.complete(FINAL_PROMPT.format(topic=topic, text=notes[0]), max_tokens=100, for_twitter=True)
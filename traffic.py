@@ -0,0 +1,390 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+import httpx
+from requests.adapters import BaseAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_TRAFFIC_FILE = 'traffic.jsonl'
+# Cursor and time-window parameters change on every run; replay ignores them when matching
+VOLATILE_PARAMS = {'since_id', 'until_id', 'next_token', 'pagination_token', 'start_time', 'end_time'}
+# Hop-by-hop and encoding headers describe the original transfer, not the recorded (decoded) body
+SKIP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie', 'keep-alive'}
+
+
+def _text(body):
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        return body.decode('utf-8', errors='replace')
+    return str(body)
+
+
+def _headers(headers):
+    return {k.lower(): v for k, v in headers.items() if k.lower() not in SKIP_HEADERS}
+
+
+def request_key(method, url, body=None):
+    """Return (exact key, path key) used to match a request to a recorded exchange"""
+    parsed = urlparse(url)
+    params = sorted((k, v) for k, v in parse_qsl(parsed.query) if k not in VOLATILE_PARAMS)
+    path = f"{method.upper()} {parsed.path}"
+    exact = f"{path}?{urlencode(params)}"
+    if body:
+        exact += '#' + hashlib.blake2b(_text(body).encode('utf-8'), digest_size=8).hexdigest()
+    return exact, path
+
+
+class TrafficRecorder:
+    """Append every API request/response pair to a JSON-lines file.
+
+    Attach it to tweepy's requests session (attach_session) and wrap the
+    OpenAI httpx transports (transport / async_transport). Entries are
+    buffered in memory and written in batches, when batch_size entries are
+    waiting or every flush_interval seconds, so recording adds no disk I/O
+    to the request path. Request headers are not recorded, so credentials
+    never end up in the file.
+    """
+
+    replay = False
+
+    def __init__(self, path=DEFAULT_TRAFFIC_FILE, batch_size=100, flush_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self._file = open(path, 'a', encoding='utf-8', buffering=1024 * 1024)
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, args=(flush_interval,),
+                                        name='traffic-recorder', daemon=True)
+        self._thread.start()
+        self.recorded = 0
+
+    def record(self, service, method, url, request_body, status, headers, body, elapsed):
+        entry = {
+            't': round(time.perf_counter() - self._start - elapsed, 4),
+            'ts': round(time.time(), 3),
+            'service': service,
+            'method': method.upper(),
+            'url': url,
+            'request_body': _text(request_body),
+            'status': status,
+            'elapsed': round(elapsed, 4),
+            'headers': _headers(headers),
+            'body': _text(body),
+        }
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._buffer.append(line)
+            self.recorded += 1
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+            if lines and not self._file.closed:
+                self._file.write(''.join(lines))
+                self._file.flush()
+
+    def _flush_loop(self, interval):
+        while not self._stop.wait(interval):
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+        with self._lock:
+            self._file.close()
+        logging.info(f"Recorded {self.recorded} API exchanges to {self.path}")
+
+    # requests (tweepy)
+
+    def attach_session(self, session, service='x'):
+        def on_response(response, *args, **kwargs):
+            request = response.request
+            self.record(service, request.method, request.url, request.body, response.status_code,
+                        response.headers, response.content, response.elapsed.total_seconds())
+        session.hooks.setdefault('response', []).append(on_response)
+
+    # httpx (OpenAI)
+
+    def transport(self, inner, service='openai'):
+        return RecordingTransport(inner, self, service)
+
+    def async_transport(self, inner, service='openai'):
+        return AsyncRecordingTransport(inner, self, service)
+
+
+def _request_content(request):
+    try:
+        return request.content
+    except Exception:  # streaming request bodies are not recorded
+        return None
+
+
+def _is_event_stream(response):
+    return response.headers.get('content-type', '').startswith('text/event-stream')
+
+
+def _tee_headers(response):
+    # The tee passes on decoded bytes, so the original encoding and length no longer apply
+    return [(k, v) for k, v in response.headers.multi_items() if k.lower() not in ('content-encoding', 'content-length')]
+
+
+class TeeStream(httpx.SyncByteStream):
+    """Pass a streamed response body through unchanged and hand the bytes read to on_close"""
+
+    def __init__(self, response, on_close):
+        self.response = response
+        self.on_close = on_close
+        self.chunks = []
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self.response.iter_bytes():
+            self.chunks.append(chunk)
+            yield chunk
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.response.close()
+            self.on_close(b''.join(self.chunks))
+
+
+class AsyncTeeStream(httpx.AsyncByteStream):
+    def __init__(self, response, on_close):
+        self.response = response
+        self.on_close = on_close
+        self.chunks = []
+        self.closed = False
+
+    async def __aiter__(self):
+        async for chunk in self.response.aiter_bytes():
+            self.chunks.append(chunk)
+            yield chunk
+
+    async def aclose(self):
+        if not self.closed:
+            self.closed = True
+            await self.response.aclose()
+            self.on_close(b''.join(self.chunks))
+
+
+class RecordingTransport(httpx.BaseTransport):
+    """httpx transport wrapper that records each exchange
+
+    Ordinary responses are read in full. Server-sent event streams (streamed
+    completions) are passed through as they arrive and recorded when the
+    caller closes them, so a stream cut off early is recorded as cut off
+    and time to first token is not delayed by recording.
+    """
+
+    def __init__(self, inner, recorder, service):
+        self.inner = inner
+        self.recorder = recorder
+        self.service = service
+
+    def _record(self, request, response, body, start):
+        self.recorder.record(self.service, request.method, str(request.url), _request_content(request),
+                             response.status_code, response.headers, body, time.perf_counter() - start)
+
+    def handle_request(self, request):
+        start = time.perf_counter()
+        response = self.inner.handle_request(request)
+        if _is_event_stream(response):
+            stream = TeeStream(response, lambda body: self._record(request, response, body, start))
+            return httpx.Response(response.status_code, headers=_tee_headers(response), stream=stream,
+                                  extensions=response.extensions, request=request)
+        response.read()
+        self._record(request, response, response.content, start)
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+class AsyncRecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner, recorder, service):
+        self.inner = inner
+        self.recorder = recorder
+        self.service = service
+
+    def _record(self, request, response, body, start):
+        self.recorder.record(self.service, request.method, str(request.url), _request_content(request),
+                             response.status_code, response.headers, body, time.perf_counter() - start)
+
+    async def handle_async_request(self, request):
+        start = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        if _is_event_stream(response):
+            stream = AsyncTeeStream(response, lambda body: self._record(request, response, body, start))
+            return httpx.Response(response.status_code, headers=_tee_headers(response), stream=stream,
+                                  extensions=response.extensions, request=request)
+        await response.aread()
+        self._record(request, response, response.content, start)
+        return response
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class TrafficReplayer:
+    """Serve API responses from a recording instead of the network.
+
+    Requests are matched on method, path, query (ignoring cursor and time
+    parameters) and body; if nothing matches exactly, the next recorded
+    response for the same method and path is used. Each key's responses
+    are served in recorded order and wrap around when exhausted, so a short
+    recording can drive a long load test. Responses wait their recorded
+    latency divided by speed (speed=0 answers immediately).
+
+    Only byte offsets are kept in memory; entries are read from the file
+    when served, so large recordings are cheap to load.
+    """
+
+    replay = True
+
+    def __init__(self, path=DEFAULT_TRAFFIC_FILE, speed=10.0):
+        self.path = path
+        self.speed = speed
+        self._exact = defaultdict(list)
+        self._by_path = defaultdict(list)
+        self._next = defaultdict(int)
+        self._lock = threading.Lock()
+        self._file = open(path, 'rb')
+        self._index()
+        self.served = 0
+        self.missed = 0
+
+    def _index(self):
+        count = 0
+        while True:
+            offset = self._file.tell()
+            line = self._file.readline()
+            if not line:
+                break
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            exact, path = request_key(entry['method'], entry['url'], entry.get('request_body'))
+            self._exact[exact].append(offset)
+            self._by_path[path].append(offset)
+            count += 1
+        logging.info(f"Loaded {count} recorded API exchanges from {self.path}")
+
+    def _lookup(self, method, url, body):
+        exact, path = request_key(method, url, body)
+        with self._lock:
+            for key, table in ((exact, self._exact), (path, self._by_path)):
+                offsets = table.get(key)
+                if offsets:
+                    offset = offsets[self._next[key] % len(offsets)]
+                    self._next[key] += 1
+                    self._file.seek(offset)
+                    self.served += 1
+                    return json.loads(self._file.readline())
+            self.missed += 1
+        logging.warning("No recorded response for %s %s", method, url)
+        return None
+
+    def _delay(self, entry):
+        if entry is None or not self.speed:
+            return 0
+        return entry.get('elapsed', 0) / self.speed
+
+    @staticmethod
+    def _not_recorded(method, url):
+        body = json.dumps({'title': 'Not Found', 'detail': f"No recorded response for {method} {url}"})
+        return 404, {'content-type': 'application/json'}, body
+
+    def respond(self, method, url, body):
+        """Return (status, headers, body text, delay) for a request"""
+        entry = self._lookup(method, url, body)
+        if entry is None:
+            return (*self._not_recorded(method, url), 0)
+        return entry['status'], entry['headers'], entry['body'] or '', self._delay(entry)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+        logging.info(f"Replayed {self.served} API exchanges ({self.missed} not found in {self.path})")
+
+    # requests (tweepy)
+
+    def attach_session(self, session, service='x'):
+        adapter = ReplayAdapter(self)
+        for prefix in list(session.adapters):
+            session.mount(prefix, adapter)
+
+    # httpx (OpenAI)
+
+    def transport(self, inner=None, service='openai'):
+        return ReplayTransport(self)
+
+    def async_transport(self, inner=None, service='openai'):
+        return AsyncReplayTransport(self)
+
+
+class ReplayAdapter(BaseAdapter):
+    """requests transport adapter that answers from a TrafficReplayer"""
+
+    def __init__(self, replayer):
+        super().__init__()
+        self.replayer = replayer
+
+    def send(self, request, **kwargs):
+        status, headers, body, delay = self.replayer.respond(request.method, request.url, request.body)
+        if delay:
+            time.sleep(delay)
+        response = Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body.encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=delay)
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
+
+
+class ReplayTransport(httpx.BaseTransport):
+    """httpx transport that answers from a TrafficReplayer"""
+
+    def __init__(self, replayer):
+        self.replayer = replayer
+
+    def handle_request(self, request):
+        status, headers, body, delay = self.replayer.respond(request.method, str(request.url),
+                                                             _request_content(request))
+        if delay:
+            time.sleep(delay)
+        return httpx.Response(status, headers=headers, content=body.encode('utf-8'), request=request)
+
+
+class AsyncReplayTransport(httpx.AsyncBaseTransport):
+    def __init__(self, replayer):
+        self.replayer = replayer
+
+    async def handle_async_request(self, request):
+        status, headers, body, delay = self.replayer.respond(request.method, str(request.url),
+                                                             _request_content(request))
+        if delay:
+            await asyncio.sleep(delay)
+        return httpx.Response(status, headers=headers, content=body.encode('utf-8'), request=request)
@@ -0,0 +1,244 @@
+import json
+import logging
+import os
+import re
+import threading
+
+import tweepy
+
+# X handles; get_users rejects the whole request if any name does not match
+USERNAME_RE = re.compile(r'^[A-Za-z0-9_]{1,15}$')
+
+
+def normalize_username(name):
+    """Strip whitespace, a leading @ and trailing commas from a handle"""
+    return name.strip().lstrip('@').rstrip(',').strip()
+
+
+def is_valid_username(name):
+    return bool(USERNAME_RE.match(name))
+
+
+class TrustedSourceStore:
+    """Persistent set of trusted usernames with a change log and cached user ids.
+
+    trusted_sources.txt stays a plain one-username-per-line snapshot. Adds
+    and removes are appended to a change log (+name / -name) instead of
+    rewriting the snapshot, and the log is folded back into the snapshot
+    once it grows past compact_after entries. Lookups are case-insensitive,
+    like X usernames.
+
+    Usernames are resolved to stable user ids through get_users (100 per
+    call) and the mapping is cached in a JSON file, so searches can use
+    from:<id> and keep matching accounts that change their handle.
+    """
+
+    def __init__(self, path='trusted_sources.txt', log_path=None, ids_path='trusted_source_ids.json',
+                 compact_after=1000):
+        self.path = path
+        self.log_path = log_path or f"{path}.log"
+        self.ids_path = ids_path
+        self.compact_after = compact_after
+        self._lock = threading.Lock()
+        self._sources = {}  # lower-case username -> username as entered
+        self._ids = {}  # lower-case username -> user id, or None if X does not know it
+        self._failed = set()  # lower-case usernames whose lookup was rejected this session
+        self._log_entries = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    name = normalize_username(line)
+                    if name and is_valid_username(name):
+                        self._sources[name.lower()] = name
+                    elif name:
+                        logging.warning(f"Ignoring invalid trusted source {name!r} in {self.path}")
+        except FileNotFoundError:
+            open(self.path, 'a').close()
+        try:
+            with open(self.log_path) as f:
+                for line in f:
+                    self._apply(line.rstrip('\n'))
+                    self._log_entries += 1
+        except FileNotFoundError:
+            pass
+        try:
+            with open(self.ids_path) as f:
+                self._ids = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self._ids = {}
+        self._keys_by_id = {value: key for key, value in self._ids.items() if value}
+
+    def _apply(self, entry):
+        op, name = entry[:1], entry[1:]
+        if op == '+' and is_valid_username(name):
+            self._sources.setdefault(name.lower(), name)
+        elif op == '-' and name:
+            self._sources.pop(name.lower(), None)
+
+    def _append_log(self, entries):
+        with open(self.log_path, 'a') as f:
+            f.write(''.join(f"{entry}\n" for entry in entries))
+        self._log_entries += len(entries)
+        if self._log_entries >= self.compact_after:
+            self._compact()
+
+    def _compact(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(''.join(f"{name}\n" for name in self._sources.values()))
+        os.replace(tmp_path, self.path)
+        open(self.log_path, 'w').close()
+        self._log_entries = 0
+        # Forget ids of sources that are gone
+        self._ids = {key: value for key, value in self._ids.items() if key in self._sources}
+        self._keys_by_id = {value: key for key, value in self._ids.items() if value}
+        self._save_ids()
+        logging.info(f"Compacted trusted sources to {len(self._sources)} entries")
+
+    def compact(self):
+        """Fold the change log into the snapshot file"""
+        with self._lock:
+            self._compact()
+
+    def __contains__(self, name):
+        return normalize_username(name).lower() in self._sources
+
+    def __len__(self):
+        return len(self._sources)
+
+    def __iter__(self):
+        return iter(list(self._sources.values()))
+
+    def __bool__(self):
+        return bool(self._sources)
+
+    def add_many(self, names, rejected=None):
+        """Add usernames, returning the ones that were new
+
+        Names that are not valid X handles are skipped and appended to
+        rejected, if a list is given.
+        """
+        added = []
+        with self._lock:
+            for name in names:
+                name = normalize_username(name)
+                if name and not is_valid_username(name):
+                    logging.warning("Skipping invalid trusted source %r", name)
+                    if rejected is not None:
+                        rejected.append(name)
+                    continue
+                if name and name.lower() not in self._sources:
+                    self._sources[name.lower()] = name
+                    if self._ids.get(name.lower(), '') is None:
+                        del self._ids[name.lower()]  # look it up again
+                    added.append(name)
+            if added:
+                self._append_log([f"+{name}" for name in added])
+        return added
+
+    def remove_many(self, names):
+        """Remove usernames, returning the ones that were present"""
+        removed = []
+        with self._lock:
+            for name in names:
+                name = self._sources.pop(normalize_username(name).lower(), None)
+                if name:
+                    removed.append(name)
+            if removed:
+                self._append_log([f"-{name}" for name in removed])
+        return removed
+
+    def add(self, name):
+        return bool(self.add_many([name]))
+
+    def remove(self, name):
+        return bool(self.remove_many([name]))
+
+    def import_file(self, filename, rejected=None):
+        """Add every username in filename (one per line or comma separated); returns the count added
+
+        Invalid handles are skipped and appended to rejected, as in add_many.
+        """
+        with open(filename) as f:
+            names = [name for line in f for name in line.replace(',', ' ').split()]
+        return len(self.add_many(names, rejected))
+
+    def export(self, filename):
+        """Write all usernames to filename, one per line"""
+        with self._lock:
+            names = list(self._sources.values())
+        with open(filename, 'w') as f:
+            f.write(''.join(f"{name}\n" for name in names))
+        return len(names)
+
+    def _save_ids(self):
+        tmp_path = f"{self.ids_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._ids, f)
+        os.replace(tmp_path, self.ids_path)
+
+    def unresolved(self):
+        with self._lock:
+            return [name for key, name in self._sources.items() if key not in self._ids and key not in self._failed]
+
+    def resolve_ids(self, client, rate_limiter=None, batch_size=100):
+        """Look up user ids for usernames not yet in the cache; returns how many were resolved
+
+        Stops early when the get_users budget runs out; the rest are
+        resolved on a later call. A batch X rejects outright (400) is logged
+        and left unresolved for the rest of the session instead of raising,
+        so one bad entry cannot stop the searches that depend on this.
+        """
+        pending = self.unresolved()
+        resolved = 0
+        for start in range(0, len(pending), batch_size):
+            if rate_limiter and not rate_limiter.acquire('get_users'):
+                logging.info("get_users budget used up, %d trusted sources left unresolved", len(pending) - start)
+                break
+            batch = pending[start:start + batch_size]
+            try:
+                response = client.get_users(usernames=batch)
+            except tweepy.errors.BadRequest as e:
+                logging.warning("get_users rejected a batch of %d trusted sources: %s", len(batch), e)
+                with self._lock:
+                    self._failed.update(name.lower() for name in batch)
+                continue
+            found = {user.username.lower(): str(user.id) for user in response.data or []}
+            with self._lock:
+                for name in batch:
+                    # Unknown or suspended accounts are remembered as None so they are not looked up again
+                    user_id = self._ids[name.lower()] = found.get(name.lower())
+                    if user_id:
+                        self._keys_by_id[user_id] = name.lower()
+                self._save_ids()
+            resolved += len(found)
+            missing = len(batch) - len(found)
+            if missing:
+                logging.warning("%d trusted sources could not be resolved to user ids", missing)
+        return resolved
+
+    def user_id(self, name):
+        return self._ids.get(normalize_username(name).lower())
+
+    def username_for(self, user_id):
+        """Return the trusted username for a user id, or None"""
+        key = self._keys_by_id.get(str(user_id))
+        return self._sources.get(key) if key else None
+
+    def query_terms(self):
+        """Return the value to use after from: for every source
+
+        Resolved sources use their user id, unresolved ones their username,
+        and usernames X reported as unknown are left out.
+        """
+        with self._lock:
+            terms = []
+            for key, name in self._sources.items():
+                if key not in self._ids:
+                    terms.append(name)
+                elif self._ids[key]:
+                    terms.append(self._ids[key])
+            return terms
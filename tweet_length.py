@@ -0,0 +1,127 @@
+import re
+import unicodedata
+
+MAX_TWEET_LENGTH = 280
+# Every link is shortened to a t.co URL of this length, however long the original
+URL_LENGTH = 23
+# Code points counted as one character; everything else counts as two (twitter-text v3 ranges)
+LIGHT_RANGES = ((0, 4351), (8192, 8205), (8208, 8223), (8242, 8247))
+
+_URL_END = r"""[^\s.,;:!?'")\]]"""
+URL_RE = re.compile(
+    rf"https?://\S*{_URL_END}"
+    rf"|(?<![\w@.])(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+"
+    rf"(?:com|net|org|io|co|ai|dev|app|me|ly|gl|gov|edu|info|xyz|tv|news)\b(?:/(?:\S*{_URL_END})?)?",
+    re.IGNORECASE
+)
+# An emoji with its modifiers (skin tone, variation selector, tags) and any ZWJ-joined
+# emoji counts as two characters, however many code points it has
+_EMOJI = r"[\u2190-\u2bff\U0001f000-\U0001faff](?:\ufe0f|[\U0001f3fb-\U0001f3ff]|[\U000e0020-\U000e007f])*"
+EMOJI_RE = re.compile(rf"[\U0001f1e6-\U0001f1ff]{{2}}|[#*0-9]\ufe0f?\u20e3|{_EMOJI}(?:\u200d{_EMOJI})*")
+WORD_RE = re.compile(r'\S*\s+')
+
+
+def _char_weight(char):
+    code = ord(char)
+    for low, high in LIGHT_RANGES:
+        if low <= code <= high:
+            return 1
+    return 2
+
+
+def _text_weight(text):
+    if text.isascii():
+        return len(text)
+    length = 0
+    pos = 0
+    for match in EMOJI_RE.finditer(text):
+        length += sum(_char_weight(c) for c in text[pos:match.start()]) + 2
+        pos = match.end()
+    return length + sum(_char_weight(c) for c in text[pos:])
+
+
+def weighted_length(text):
+    """Length of text as X counts it against the 280 limit
+
+    URLs count as 23, emoji sequences and CJK or other wide characters as
+    2, and text is NFC-normalized first.
+    """
+    text = unicodedata.normalize('NFC', text)
+    length = 0
+    pos = 0
+    if '.' in text:
+        for match in URL_RE.finditer(text):
+            length += _text_weight(text[pos:match.start()]) + URL_LENGTH
+            pos = match.end()
+    return length + _text_weight(text[pos:])
+
+
+def truncate_tweet(text, limit=MAX_TWEET_LENGTH):
+    """Cut text to fit limit, at a word boundary where possible, ending in '...'"""
+    if weighted_length(text) <= limit:
+        return text
+    counter = TweetLengthCounter(limit - 3)
+    counter.feed(text)
+    counter.finish()
+    kept = counter.result()
+    if not kept:
+        # A single word longer than the limit: cut it by character
+        length = 0
+        for end, char in enumerate(text):
+            length += _char_weight(char)
+            if length > limit - 3:
+                break
+        kept = text[:end]
+    return kept + "..."
+
+
+class TweetLengthCounter:
+    """Weighted length of text that arrives in pieces, such as a streamed completion.
+
+    URLs and emoji sequences never span whitespace, so each word is measured
+    once, when the whitespace after it arrives; the unfinished word at the
+    end is held back until then (or until finish). Words are accepted while
+    the text fits the limit; the first one that does not sets exceeded and
+    everything after it is ignored.
+    """
+
+    def __init__(self, limit=MAX_TWEET_LENGTH):
+        self.limit = limit
+        self.text = ''
+        self.length = 0
+        self.pending = ''
+        self.exceeded = False
+
+    def _accept(self, word):
+        # Whitespace after a word only counts once another word follows it
+        if self.length + weighted_length(word.rstrip()) > self.limit:
+            self.exceeded = True
+            return False
+        self.text += word
+        self.length += weighted_length(word)
+        return True
+
+    def feed(self, piece):
+        """Add streamed text; returns the part of the text that is now complete and fits"""
+        if self.exceeded:
+            return ''
+        self.pending += piece
+        accepted = []
+        end = 0
+        for match in WORD_RE.finditer(self.pending):
+            if not self._accept(match.group()):
+                break
+            accepted.append(match.group())
+            end = match.end()
+        self.pending = '' if self.exceeded else self.pending[end:]
+        return ''.join(accepted)
+
+    def finish(self):
+        """Count the held-back last word; returns it if it fits"""
+        piece, self.pending = self.pending, ''
+        if self.exceeded or not piece or not self._accept(piece):
+            return ''
+        return piece
+
+    def result(self):
+        return self.text.strip()